@@ -1,7 +1,22 @@
 from .base_models import *
 from .base_delete import *
+from .base_bulk import *
+from .db_router import *
 from .decorators import *
 from .utils import *
 from .log import *
 from .base_query import *
+from .base_cursor import *
+from .base_count import *
+from .base_filter import *
+from .keyword_search import *
+from .fast_serializer import *
+from .base_export import *
+from .result_cache import *
+from .metrics import *
 from .org import *
+from .org_index import *
+from .org_path import *
+from .singleflight import *
+from .redis_context import *
+from .local_cache import *
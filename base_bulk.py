@@ -0,0 +1,288 @@
+from functools import reduce
+from operator import or_
+from typing import Iterable, List, Type, TypeVar
+
+from django.core.exceptions import PermissionDenied
+from django.db import connections, models, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .base_models import after_model_write
+from .base_query import (
+    collect_org_cache_keys,
+    delete_user_organizations,
+    get_org_scope_filter,
+    get_user_organizations,
+    invalidate_org_cache_keys,
+)
+from .keyword_search import refresh_keyword_index
+from .metrics import incr, timed
+from .org import Org
+from .org_path import rebuild_org_paths
+from .utils import get_setting
+
+T = TypeVar("T", bound=models.Model)
+
+
+def _batch_size(batch_size):
+    """
+    配置项 settings.BULK:
+    - BATCH_SIZE: 每批写入数量，默认 1000
+    - ORG_INVALIDATE_LIMIT: 批量写入机构超过该数量时重建全部物化路径并清空机构缓存，
+      否则只处理受影响的子树，默认 100
+    """
+    return batch_size or get_setting("BULK", "BATCH_SIZE", 1000)
+
+
+def _org_parents(model_class, db, pks) -> dict:
+    """
+    机构写入前记录上级机构，用于失效原上级机构链上的缓存
+    """
+    if not issubclass(model_class, Org) or pks is None:
+        return {}
+    return dict(
+        model_class._base_manager.using(db).filter(pk__in=pks).values_list("id", "org_id")
+    )
+
+
+def _after_write(model_class, db, pks, fields=None, prev_parents=None):
+    """
+    批量写入不触发 save 与信号：递增模型版本号，刷新检索索引，
+    机构层级变更时重建受影响子树的物化路径并失效相关机构缓存
+
+    :param pks: 写入数据的主键，为 None 或含 None 时按全部数据处理
+    :param fields: 修改的字段，None 表示新增或整行写入
+    :param prev_parents: 机构写入前的 {id: 上级机构id}
+    """
+    after_model_write(model_class, using=db)
+    refresh_keyword_index(model_class, pks, using=db)
+    if not issubclass(model_class, Org):
+        return
+    if fields is not None and not {"org_id", "is_delete"} & set(fields):
+        # 层级未变化
+        return
+
+    if (
+        pks is None
+        or None in pks
+        or len(pks) > get_setting("BULK", "ORG_INVALIDATE_LIMIT", 100)
+    ):
+        rebuild_org_paths(using=db)
+        transaction.on_commit(delete_user_organizations, using=db)
+        return
+
+    pks = list(pks)
+    if fields is None or "org_id" in fields:
+        rebuild_org_paths(using=db, org_ids=pks)
+    parents = _org_parents(model_class, db, pks)
+    prev_parents = prev_parents or {}
+
+    def invalidate():
+        keys = set()
+        for pk in pks:
+            keys |= collect_org_cache_keys(pk, {parents.get(pk), prev_parents.get(pk)})
+        invalidate_org_cache_keys(keys)
+
+    transaction.on_commit(invalidate, using=db)
+
+
+def _check_org_scope(instances: List[T], org_id) -> set:
+    """
+    校验数据所属机构均在用户可访问的机构范围内，未指定所属机构的数据归属用户所在机构
+    """
+    allowed_org_ids = set(get_user_organizations(org_id))
+    for instance in instances:
+        if instance.org_id is None:
+            instance.org_id = int(org_id)
+        elif instance.org_id not in allowed_org_ids:
+            raise PermissionDenied(f"无权写入机构{instance.org_id}的数据")
+    return allowed_org_ids
+
+
+def _check_existing_scope(queryset, allowed_org_ids):
+    """
+    校验将被修改的已有数据均在用户可访问的机构范围内
+    """
+    if queryset.exclude(org_id__in=allowed_org_ids).exists():
+        raise PermissionDenied("无权修改其他机构的数据")
+
+
+def bulk_create_model_instances(
+    model_class: Type[T],
+    instances: Iterable[T],
+    operator: str = None,
+    db: str = "default",
+    org_id: str = None,
+    batch_size: int = None,
+) -> List[T]:
+    """
+    批量新增，填充创建人、更新人，按批次插入
+
+    :param model_class: 模型类，例如 Org
+    :param instances: 未保存的实例
+    :param operator: 操作人，写入 creator / updater
+    :param db: 指定数据库，默认为 default
+    :param org_id: 用户所在机构，传入时校验数据所属机构在可访问范围内
+    :param batch_size: 每批插入数量
+    """
+    instances = list(instances)
+    if not instances:
+        return instances
+    if org_id:
+        _check_org_scope(instances, org_id)
+    for instance in instances:
+        instance.creator = operator or instance.creator
+        instance.updater = operator or instance.updater or instance.creator
+
+    with timed("bulk_seconds", op="create"), transaction.atomic(using=db):
+        created = model_class._base_manager.using(db).bulk_create(
+            instances, batch_size=_batch_size(batch_size)
+        )
+        _after_write(model_class, db, [instance.pk for instance in created])
+    incr("bulk_rows_total", len(created), op="create")
+    return created
+
+
+def bulk_update_model_instances(
+    model_class: Type[T],
+    instances: Iterable[T],
+    fields: List[str],
+    operator: str = None,
+    db: str = "default",
+    org_id: str = None,
+    batch_size: int = None,
+) -> int:
+    """
+    批量修改已有实例的指定字段，同时刷新更新人与更新时间
+
+    :param fields: 需要修改的字段
+    :param org_id: 用户所在机构，传入时校验修改前后的所属机构均在可访问范围内
+    :return: 修改数量
+    """
+    instances = list(instances)
+    if not instances:
+        return 0
+    now = timezone.now()
+    for instance in instances:
+        instance.update_time = now
+        if operator:
+            instance.updater = operator
+    fields = list(dict.fromkeys([*fields, "updater", "update_time"]))
+
+    pks = [instance.pk for instance in instances]
+
+    with timed("bulk_seconds", op="update"), transaction.atomic(using=db):
+        if org_id:
+            allowed_org_ids = _check_org_scope(instances, org_id)
+            _check_existing_scope(
+                model_class._base_manager.using(db).filter(pk__in=pks),
+                allowed_org_ids,
+            )
+        prev_parents = _org_parents(model_class, db, pks)
+        length = model_class._base_manager.using(db).bulk_update(
+            instances, fields, batch_size=_batch_size(batch_size)
+        )
+        _after_write(model_class, db, pks, fields, prev_parents)
+    incr("bulk_rows_total", length, op="update")
+    return length
+
+
+def bulk_upsert_model_instances(
+    model_class: Type[T],
+    instances: Iterable[T],
+    unique_fields: List[str],
+    update_fields: List[str],
+    operator: str = None,
+    db: str = "default",
+    org_id: str = None,
+    batch_size: int = None,
+) -> List[T]:
+    """
+    批量新增或修改：唯一键冲突时修改 update_fields，
+    MySQL 使用 ON DUPLICATE KEY UPDATE，PostgreSQL/SQLite 使用 ON CONFLICT DO UPDATE
+
+    冲突时保留原有的创建人与创建时间，刷新更新人与更新时间
+
+    :param unique_fields: 判断冲突的唯一键字段，MySQL 以表上的唯一索引为准
+    :param update_fields: 冲突时修改的字段
+    :param org_id: 用户所在机构，传入时校验新数据及将被覆盖的已有数据均在可访问范围内
+    """
+    instances = list(instances)
+    if not instances:
+        return instances
+    for instance in instances:
+        instance.creator = operator or instance.creator
+        instance.updater = operator or instance.updater or instance.creator
+    update_fields = [
+        field
+        for field in dict.fromkeys([*update_fields, "updater", "update_time"])
+        if field not in ("creator", "create_time")
+    ]
+    batch_size = _batch_size(batch_size)
+    manager = model_class._base_manager.using(db)
+
+    with timed("bulk_seconds", op="upsert"), transaction.atomic(using=db):
+        if org_id:
+            allowed_org_ids = _check_org_scope(instances, org_id)
+            for start in range(0, len(instances), batch_size):
+                batch = instances[start : start + batch_size]
+                conflicts = reduce(
+                    or_,
+                    (
+                        Q(**{field: getattr(instance, field) for field in unique_fields})
+                        for instance in batch
+                    ),
+                )
+                _check_existing_scope(manager.filter(conflicts), allowed_org_ids)
+        upserted = manager.bulk_create(
+            instances,
+            batch_size=batch_size,
+            update_conflicts=True,
+            # MySQL 不支持指定冲突字段
+            unique_fields=unique_fields
+            if connections[db].features.supports_update_conflicts_with_target
+            else None,
+            update_fields=update_fields,
+        )
+        # 冲突时修改了哪些已有机构无法预先确定，机构按全部数据处理
+        _after_write(
+            model_class,
+            db,
+            None if issubclass(model_class, Org) else [i.pk for i in upserted],
+        )
+    incr("bulk_rows_total", len(upserted), op="upsert")
+    return upserted
+
+
+def update_model_instances(
+    model_class: Type[T],
+    instance_ids: list[int],
+    values: dict,
+    operator: str = None,
+    db: str = "default",
+    org_id: str = None,
+) -> int:
+    """
+    按ID批量修改为相同的值（queryset.update），同时刷新更新人与更新时间
+
+    :param values: 需要修改的字段及值，例如 {"status": 1}
+    :param org_id: 用户所在机构，传入时只修改可访问机构范围内的数据
+    :return: 修改数量
+    """
+    query_data = Q(id__in=instance_ids)
+    if org_id:
+        if "org_id" in values and values["org_id"] not in get_user_organizations(org_id):
+            raise PermissionDenied(f"无权写入机构{values['org_id']}的数据")
+        query_data &= get_org_scope_filter(org_id)
+
+    values = {**values, "update_time": timezone.now()}
+    if operator:
+        values["updater"] = operator
+
+    with timed("bulk_seconds", op="update"), transaction.atomic(using=db):
+        prev_parents = _org_parents(model_class, db, instance_ids)
+        length = model_class._base_manager.using(db).filter(query_data).update(**values)
+        if length:
+            _after_write(model_class, db, instance_ids, list(values), prev_parents)
+    incr("bulk_rows_total", length, op="update")
+    return length
@@ -0,0 +1,142 @@
+import hashlib
+import json
+from typing import Optional, Tuple
+
+from django.core.exceptions import EmptyResultSet
+from django.db import DatabaseError, connections
+from redis import RedisError
+
+from .utils import get_redis_cli, get_setting
+from .log import logger
+
+try:
+    from django.core.exceptions import FullResultSet
+except ImportError:  # Django < 4.2
+    FullResultSet = EmptyResultSet
+
+# 总数统计模式
+COUNT_EXACT = "exact"  # 精确 COUNT(*)
+COUNT_CACHED = "cached"  # 按查询条件缓存精确总数
+COUNT_ESTIMATED = "estimated"  # 执行计划/表统计信息估算
+
+
+def get_total(queryset, mode=None) -> Tuple[int, str]:
+    """
+    获取分页列表的总数
+
+    total, total_mode = get_total(queryset, COUNT_CACHED)
+    json_response(data=data, total=total, totalMode=total_mode)
+
+    配置项 settings.LIST_COUNT:
+    - MODE: 默认统计模式，默认 exact
+    - CACHE_TTL: cached 模式缓存时间(秒)，默认 30
+    - ESTIMATE_THRESHOLD: estimated 模式下估算值低于该阈值时改用精确统计，默认 100000
+
+    :param queryset: 已应用过滤条件（含机构范围）的查询集
+    :param mode: 统计模式 exact / cached / estimated
+    :return: (总数, 实际使用的统计模式)
+    """
+    mode = mode or get_setting("LIST_COUNT", "MODE", COUNT_EXACT)
+    queryset = queryset.order_by()
+
+    if mode in (COUNT_ESTIMATED, COUNT_CACHED):
+        try:
+            queryset.query.sql_with_params()
+        except EmptyResultSet:
+            # 条件必然为空（如空的机构范围 org_id IN ()），无需访问缓存或执行计划
+            return 0, COUNT_EXACT
+        except FullResultSet:
+            return queryset.count(), COUNT_EXACT
+
+    if mode == COUNT_ESTIMATED:
+        estimate = _estimate_count(queryset)
+        threshold = get_setting("LIST_COUNT", "ESTIMATE_THRESHOLD", 100000)
+        if estimate is not None and estimate >= threshold:
+            return estimate, COUNT_ESTIMATED
+        return queryset.count(), COUNT_EXACT
+
+    if mode == COUNT_CACHED:
+        return _cached_count(queryset), COUNT_CACHED
+
+    return queryset.count(), COUNT_EXACT
+
+
+def _count_cache_key(queryset) -> str:
+    """
+    以 SQL 及参数（含过滤条件与机构范围）归一化生成缓存键
+    """
+    sql, params = queryset.query.sql_with_params()
+    raw = json.dumps([queryset.db, sql, params], default=str, ensure_ascii=False)
+    digest = hashlib.sha1(raw.encode()).hexdigest()
+    return f"list_count:{queryset.model._meta.db_table}:{digest}"
+
+
+def _cached_count(queryset) -> int:
+    redis_key = _count_cache_key(queryset)
+    try:
+        if (cached := get_redis_cli().get(redis_key)) is not None:
+            return int(cached)
+    except RedisError as e:
+        logger.warning(f"总数缓存读取失败: {str(e)}")
+        return queryset.count()
+
+    total = queryset.count()
+    try:
+        get_redis_cli().set(
+            redis_key, total, ex=get_setting("LIST_COUNT", "CACHE_TTL", 30)
+        )
+    except RedisError as e:
+        logger.warning(f"总数缓存写入失败: {str(e)}")
+    return total
+
+
+def _estimate_count(queryset) -> Optional[int]:
+    """
+    估算查询结果行数，不支持的数据库返回 None
+    - 无过滤条件: 读取表统计信息
+    - 有过滤条件: 读取执行计划的预估行数
+    """
+    connection = connections[queryset.db]
+    vendor = connection.vendor
+    table = queryset.model._meta.db_table
+    try:
+        with connection.cursor() as cursor:
+            if not queryset.query.where:
+                if vendor == "mysql":
+                    cursor.execute(
+                        "SELECT TABLE_ROWS FROM information_schema.TABLES "
+                        "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s",
+                        [table],
+                    )
+                    row = cursor.fetchone()
+                    return int(row[0]) if row and row[0] is not None else None
+                if vendor == "postgresql":
+                    cursor.execute(
+                        "SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass",
+                        [table],
+                    )
+                    row = cursor.fetchone()
+                    return int(row[0]) if row and row[0] >= 0 else None
+                return None
+
+            sql, params = queryset.query.sql_with_params()
+            if vendor == "mysql":
+                cursor.execute(f"EXPLAIN {sql}", params)
+                columns = [col[0].lower() for col in cursor.description]
+                row = cursor.fetchone()
+                if not row or "rows" not in columns:
+                    return None
+                rows = row[columns.index("rows")] or 0
+                filtered = 100
+                if "filtered" in columns:
+                    filtered = row[columns.index("filtered")] or 100
+                return int(rows * filtered / 100)
+            if vendor == "postgresql":
+                cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}", params)
+                plan = cursor.fetchone()[0]
+                if isinstance(plan, str):
+                    plan = json.loads(plan)
+                return int(plan[0]["Plan"]["Plan Rows"])
+    except DatabaseError as e:
+        logger.warning(f"总数估算失败: {str(e)}")
+    return None
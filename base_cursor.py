@@ -0,0 +1,155 @@
+import base64
+import json
+import uuid
+from datetime import date, datetime
+from decimal import Decimal
+from typing import List, Optional, Tuple
+
+from django.db.models import Q
+
+
+class InvalidCursor(ValueError):
+    """
+    游标格式错误、类型无法识别或与排序字段不匹配
+    """
+
+
+def get_cursor_ordering(ordering: List[str]) -> List[str]:
+    """
+    补充 id 作为排序的最后一列，保证游标位置唯一
+
+    get_cursor_ordering(["-create_time"])  # 输出：["-create_time", "-id"]
+    """
+    ordering = list(ordering)
+    if "id" not in ordering and "-id" not in ordering:
+        descending = bool(ordering) and ordering[-1].startswith("-")
+        ordering.append("-id" if descending else "id")
+    return ordering
+
+
+def _encode_value(value):
+    if isinstance(value, datetime):
+        return {"t": "dt", "v": value.isoformat()}
+    if isinstance(value, date):
+        return {"t": "d", "v": value.isoformat()}
+    if isinstance(value, Decimal):
+        return {"t": "dec", "v": str(value)}
+    if isinstance(value, uuid.UUID):
+        return {"t": "uuid", "v": str(value)}
+    return value
+
+
+_DECODERS = {
+    "dt": datetime.fromisoformat,
+    "d": date.fromisoformat,
+    "dec": Decimal,
+    "uuid": uuid.UUID,
+}
+
+
+def _decode_value(value):
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+    if not isinstance(value, dict) or set(value) != {"t", "v"}:
+        raise InvalidCursor(f"无效的游标值: {value!r}")
+    kind, raw = value["t"], value["v"]
+    decoder = _DECODERS.get(kind) if isinstance(kind, str) else None
+    if decoder is None:
+        raise InvalidCursor(f"无法识别的游标值类型: {kind!r}")
+    if not isinstance(raw, str):
+        raise InvalidCursor(f"无效的游标值: {value!r}")
+    try:
+        return decoder(raw)
+    except (ArithmeticError, TypeError, ValueError) as e:
+        raise InvalidCursor(f"无效的游标值: {value!r}") from e
+
+
+def encode_cursor(values: list) -> str:
+    """
+    将最后一行的排序键编码为不透明游标
+    """
+    raw = json.dumps([_encode_value(v) for v in values], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, ordering: List[str] = None) -> list:
+    """
+    解析游标，格式错误或与排序字段数量不一致时抛出 InvalidCursor
+
+    :param ordering: 排序规则，传入时校验游标值数量
+    """
+    if not isinstance(cursor, str):
+        raise InvalidCursor("无效的游标")
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        values = json.loads(raw)
+    except (TypeError, ValueError) as e:
+        raise InvalidCursor(f"无效的游标: {cursor}") from e
+    if not isinstance(values, list):
+        raise InvalidCursor(f"无效的游标: {cursor}")
+    if ordering is not None and len(values) != len(ordering):
+        raise InvalidCursor("游标与排序字段不匹配")
+    return [_decode_value(v) for v in values]
+
+
+def get_seek_filter(ordering: List[str], values: list) -> Q:
+    """
+    根据排序规则和游标值生成定位条件（keyset 分页）
+
+    排序 ["-create_time", "-id"]、游标 [t, 5] 生成:
+    create_time < t OR (create_time = t AND id < 5)
+
+    排序字段应为非空字段；为空时按 MySQL 语义（NULL 最小）处理
+    """
+    if len(ordering) != len(values):
+        raise InvalidCursor("游标与排序字段不匹配")
+
+    seek = Q()
+    equal = Q()
+    for field, value in zip(ordering, values):
+        descending = field.startswith("-")
+        name = field.lstrip("-")
+        if value is None:
+            # NULL 最小：升序时大于 NULL 即非空，降序时不存在小于 NULL 的值
+            if not descending:
+                seek |= equal & Q(**{f"{name}__isnull": False})
+            equal &= Q(**{f"{name}__isnull": True})
+        else:
+            lookup = "lt" if descending else "gt"
+            seek |= equal & Q(**{f"{name}__{lookup}": value})
+            equal &= Q(**{name: value})
+    return seek
+
+
+def get_cursor_values(row, ordering: List[str]) -> list:
+    """
+    从模型实例或 values() 字典中取出排序键
+    """
+    values = []
+    for field in ordering:
+        name = field.lstrip("-")
+        if isinstance(row, dict):
+            values.append(row[name])
+            continue
+        value = row
+        for part in name.split("__"):
+            value = getattr(value, part) if value is not None else None
+        values.append(value)
+    return values
+
+
+def paginate_by_cursor(queryset, ordering: List[str], limit) -> Tuple[list, Optional[str]]:
+    """
+    按游标分页获取一页数据
+
+    queryset 应已应用 getBaseParams(cursor_mode=True) 返回的查询条件，
+    ordering 为其返回的排序规则
+
+    :return: (当前页数据, 下一页游标)，没有下一页时游标为 None
+    """
+    limit = int(limit)
+    rows = list(queryset.order_by(*ordering)[: limit + 1])
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    return rows, encode_cursor(get_cursor_values(rows[-1], ordering))
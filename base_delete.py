@@ -1,17 +1,44 @@
-from django.db import models
-from typing import TypeVar, Type
+import time
+from django.db import models, transaction
+from django.db.models.deletion import Collector
+from typing import Callable, List, TypeVar, Type
 from django.db.models import Q
-from .base_query import get_user_organizations
+from .base_query import (
+    collect_org_cache_keys,
+    get_org_scope_filter,
+    invalidate_org_cache_keys,
+)
+from .base_models import after_model_write
+from .metrics import incr, observe, timed
+from .org import Org
+from .log import logger
 
 T = TypeVar("T", bound=models.Model)
 
 
+def _soft_delete(model_class, queryset, db) -> int:
+    """
+    逻辑删除，update 不触发信号，需手动失效机构缓存
+    """
+    org_cache_keys = set()
+    if issubclass(model_class, Org):
+        for instance_id, parent_id in queryset.values_list("id", "org_id"):
+            org_cache_keys |= collect_org_cache_keys(instance_id, [parent_id])
+    length = queryset.update(is_delete=1)
+    if org_cache_keys:
+        transaction.on_commit(lambda: invalidate_org_cache_keys(org_cache_keys), using=db)
+    return length
+
+
 def delete_model_instances(
     model_class: Type[T],
     instance_ids: list[int],
     db: str = "default",
     soft_delete: bool = True,
     org_id: str = None,
+    chunk_size: int = None,
+    pause: float = 0,
+    progress_callback: Callable = None,
 ) -> int:
     """
     删除指定模型的多个实例，可以选择物理删除或逻辑删除。
@@ -21,20 +48,111 @@ def delete_model_instances(
     :param db: 指定数据库 ，默认为 default
     :param soft_delete: 是否执行逻辑删除，默认为 True
     :param org_id: 用户所在机构
+    :param chunk_size: 每批删除数量，传入时分批删除，见 delete_model_instances_in_chunks
+    :param pause: 分批删除时每批之间的间隔(秒)
+    :param progress_callback: 分批删除时每批完成后的回调
     """
+    if chunk_size:
+        stats = delete_model_instances_in_chunks(
+            model_class,
+            instance_ids,
+            db=db,
+            soft_delete=soft_delete,
+            org_id=org_id,
+            chunk_size=chunk_size,
+            pause=pause,
+            progress_callback=progress_callback,
+        )
+        return sum(stat["deleted"] for stat in stats)
+
     length = 0
 
     query_data = Q()
     if org_id:
-        allowed_org_ids = get_user_organizations(org_id)
-        query_data &= Q(org_id__in=allowed_org_ids)
+        query_data &= get_org_scope_filter(org_id)
 
     query_data &= Q(id__in=instance_ids)
 
-    if soft_delete:
-        # 逻辑删除
-        length = model_class.objects.using(db).filter(query_data).update(is_delete=1)
-    else:
-        # 物理删除
-        length, _ = model_class.objects.using(db).filter(query_data).delete()
+    mode = "soft" if soft_delete else "hard"
+    with timed("delete_seconds", mode=mode):
+        if soft_delete:
+            # 逻辑删除
+            length = _soft_delete(
+                model_class, model_class.objects.using(db).filter(query_data), db
+            )
+        else:
+            # 物理删除
+            length, _ = model_class._base_manager.using(db).filter(query_data).delete()
+    if length:
+        after_model_write(model_class, using=db)
+    incr("deleted_rows_total", length, mode=mode)
     return length
+
+
+def delete_model_instances_in_chunks(
+    model_class: Type[T],
+    instance_ids: list[int],
+    db: str = "default",
+    soft_delete: bool = True,
+    org_id: str = None,
+    chunk_size: int = 1000,
+    pause: float = 0,
+    progress_callback: Callable = None,
+) -> List[dict]:
+    """
+    分批删除指定模型的多个实例，每批在独立事务中执行，避免超大语句与长时间锁表。
+
+    物理删除时，无级联关系与删除信号的模型直接执行 DELETE，不加载关联对象。
+
+    :param chunk_size: 每批删除数量，默认 1000
+    :param pause: 每批之间的间隔(秒)，用于降低主从延迟
+    :param progress_callback: 每批完成后调用，参数为该批统计信息
+    :return: 每批统计信息列表，格式为
+             {"chunk": 批次, "requested": 本批ID数, "deleted": 删除数,
+              "fast_path": 是否直接删除, "elapsed": 耗时(秒),
+              "processed": 累计处理ID数, "total": ID总数}
+    """
+    scope = Q()
+    if org_id:
+        scope &= get_org_scope_filter(org_id)
+
+    ids = list(dict.fromkeys(instance_ids))
+    total = len(ids)
+    mode = "soft" if soft_delete else "hard"
+    stats = []
+    for start in range(0, total, chunk_size):
+        chunk = ids[start : start + chunk_size]
+        started = time.monotonic()
+        fast_path = False
+        with transaction.atomic(using=db):
+            # 物理删除包含已逻辑删除的数据
+            manager = model_class.objects if soft_delete else model_class._base_manager
+            queryset = manager.using(db).filter(scope & Q(id__in=chunk))
+            if soft_delete:
+                deleted = _soft_delete(model_class, queryset, db)
+            elif Collector(using=db).can_fast_delete(queryset):
+                fast_path = True
+                deleted = queryset._raw_delete(db)
+            else:
+                deleted, _ = queryset.delete()
+            if deleted:
+                after_model_write(model_class, using=db)
+
+        stat = {
+            "chunk": len(stats) + 1,
+            "requested": len(chunk),
+            "deleted": deleted,
+            "fast_path": fast_path,
+            "elapsed": time.monotonic() - started,
+            "processed": start + len(chunk),
+            "total": total,
+        }
+        stats.append(stat)
+        observe("delete_seconds", stat["elapsed"], mode="fast" if fast_path else mode)
+        incr("deleted_rows_total", deleted, mode="fast" if fast_path else mode)
+        logger.info("分批删除 %s: %s", model_class._meta.db_table, stat)
+        if progress_callback is not None:
+            progress_callback(stat)
+        if pause and start + chunk_size < total:
+            time.sleep(pause)
+    return stats
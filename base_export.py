@@ -0,0 +1,119 @@
+import csv
+import io
+import json
+from typing import Iterator, List
+from urllib.parse import quote
+
+from django.db import connections
+from django.db.models import Q
+from django.http import StreamingHttpResponse
+
+from .base_cursor import get_cursor_ordering, get_seek_filter
+from .fast_serializer import iter_serialized, serialize_queryset
+from .log import logger
+
+EXPORT_NDJSON = "ndjson"
+EXPORT_CSV = "csv"
+
+
+def iter_export_rows(serializer_class, queryset, ordering, chunk_size=2000) -> Iterator[dict]:
+    """
+    逐批读取并序列化导出数据，内存占用与总行数无关
+    - PostgreSQL/Oracle 等: 服务端游标 iterator(chunk_size)
+    - MySQL: 驱动不支持流式读取，改为按排序键 keyset 分批查询
+    """
+    if connections[queryset.db].vendor != "mysql":
+        yield from iter_serialized(
+            serializer_class, queryset.order_by(*ordering), chunk_size
+        )
+        return
+
+    ordering = get_cursor_ordering(ordering)
+    names = [field.lstrip("-") for field in ordering]
+    id_index = names.index("id")
+    seek = Q()
+    while True:
+        keys = list(
+            queryset.filter(seek).order_by(*ordering).values_list(*names)[:chunk_size]
+        )
+        if not keys:
+            return
+        ids = [key[id_index] for key in keys]
+        yield from serialize_queryset(
+            serializer_class, queryset.filter(id__in=ids).order_by(*ordering)
+        )
+        if len(keys) < chunk_size:
+            return
+        seek = get_seek_filter(ordering, list(keys[-1]))
+
+
+def _ndjson_stream(rows) -> Iterator[bytes]:
+    for row in rows:
+        yield (json.dumps(row, ensure_ascii=False, default=str) + "\n").encode()
+
+
+def _csv_stream(rows, fields: List[str] = None, batch_size=500) -> Iterator[bytes]:
+    buffer = io.StringIO()
+    writer = None
+    # 带 BOM，Excel 打开中文不乱码
+    buffer.write("\ufeff")
+    count = 0
+    for row in rows:
+        if writer is None:
+            writer = csv.DictWriter(
+                buffer, fieldnames=fields or list(row.keys()), extrasaction="ignore"
+            )
+            writer.writeheader()
+        writer.writerow(row)
+        count += 1
+        if count % batch_size == 0:
+            yield buffer.getvalue().encode()
+            buffer.seek(0)
+            buffer.truncate()
+    if writer is None and fields:
+        csv.DictWriter(buffer, fieldnames=fields).writeheader()
+    yield buffer.getvalue().encode()
+
+
+def export_response(
+    model_class,
+    serializer_class,
+    query_data: Q,
+    sorter,
+    fmt=EXPORT_NDJSON,
+    filename=None,
+    fields: List[str] = None,
+    chunk_size=2000,
+) -> StreamingHttpResponse:
+    """
+    流式导出查询结果（NDJSON / CSV）
+
+    query_data, sorter, _, _ = getBaseParams(request, model=Org)
+    return export_response(Org, OrgSerializer, query_data, sorter, fmt="csv")
+
+    :param model_class: 模型类
+    :param serializer_class: BaseModelSerializer 子类，导出字段与列表接口一致
+    :param query_data: getBaseParams 返回的查询条件
+    :param sorter: getBaseParams 返回的排序规则
+    :param fmt: ndjson 或 csv
+    :param filename: 下载文件名，默认 {表名}.{fmt}
+    :param fields: CSV 列（输出字段名），默认取首行全部字段
+    :param chunk_size: 每批读取行数
+    """
+    # 删除状态已由 getBaseParams 的 no_is_delete 决定，不使用默认管理器的过滤
+    queryset = model_class._base_manager.filter(query_data)
+    rows = iter_export_rows(serializer_class, queryset, sorter, chunk_size)
+    if fmt == EXPORT_CSV:
+        content, content_type = _csv_stream(rows, fields), "text/csv; charset=utf-8"
+    elif fmt == EXPORT_NDJSON:
+        content, content_type = _ndjson_stream(rows), "application/x-ndjson"
+    else:
+        raise ValueError(f"不支持的导出格式: {fmt}")
+
+    filename = filename or f"{model_class._meta.db_table}.{fmt}"
+    logger.info(f"开始导出 {model_class._meta.db_table}: {fmt}")
+    response = StreamingHttpResponse(content, content_type=content_type)
+    response["Content-Disposition"] = (
+        f"attachment; filename*=UTF-8''{quote(filename)}"
+    )
+    return response
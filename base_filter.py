@@ -0,0 +1,106 @@
+from typing import Dict, Tuple
+
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db import models
+from django.db.models import Q
+
+from .utils import camel_to_snake, get_setting
+
+# 字段过滤方式
+KIND_EXACT = "exact"  # 数值/布尔/外键：exact 或 in
+KIND_STRING = "string"  # 字符串：istartswith / icontains 等
+KIND_LEGACY = "legacy"  # 其他或非模型字段：保持原有 icontains
+
+_EXACT_FIELDS = (
+    models.IntegerField,
+    models.AutoField,
+    models.FloatField,
+    models.DecimalField,
+    models.BooleanField,
+    models.ForeignKey,
+    models.UUIDField,
+)
+_STRING_FIELDS = (models.CharField, models.TextField)
+
+# 编译结果缓存：(模型, 字段元组, 字符串匹配方式) -> 过滤计划
+_plan_cache: Dict[tuple, Tuple[tuple, ...]] = {}
+# 字段组合来自请求，限制缓存条目数，超出后整体清空
+PLAN_CACHE_SIZE = 1024
+
+
+def compile_filter_plan(model_class, keys, string_lookup=None) -> Tuple[tuple, ...]:
+    """
+    按模型字段类型编译过滤计划，结果按模型与字段集合缓存
+
+    :param model_class: 模型类
+    :param keys: 请求中的过滤字段（驼峰命名）
+    :param string_lookup: 字符串字段匹配方式，默认读取 settings.FILTER["STRING_LOOKUP"]，
+                          未配置时为 icontains
+    :return: (驼峰字段名, 下划线字段名, 模型字段, 过滤方式, 是否时间字段) 元组
+    """
+    string_lookup = string_lookup or get_setting("FILTER", "STRING_LOOKUP", "icontains")
+    cache_key = (model_class, tuple(keys), string_lookup)
+    if (plan := _plan_cache.get(cache_key)) is not None:
+        return plan
+
+    entries = []
+    for key in keys:
+        name = camel_to_snake(key)
+        try:
+            field = model_class._meta.get_field(name)
+        except FieldDoesNotExist:
+            field = None
+
+        if isinstance(field, _EXACT_FIELDS):
+            kind = KIND_EXACT
+        elif isinstance(field, _STRING_FIELDS) and not field.choices:
+            kind = KIND_STRING
+        elif isinstance(field, _STRING_FIELDS):
+            # 带 choices 的字符串字段为枚举值
+            kind = KIND_EXACT
+        else:
+            kind = KIND_LEGACY
+        entries.append((key, name, field, kind, "Time" in key))
+
+    plan = tuple(entries)
+    if len(_plan_cache) >= PLAN_CACHE_SIZE:
+        _plan_cache.clear()
+    _plan_cache[cache_key] = plan
+    return plan
+
+
+def _exact_condition(name, field, value) -> Q:
+    try:
+        if isinstance(value, (list, tuple, set)):
+            values = [field.to_python(v) for v in value if v not in (None, "")]
+            return Q(**{f"{name}__in": values})
+        return Q(**{name: field.to_python(value)})
+    except ValidationError:
+        # 类型不匹配的值不可能命中
+        return Q(pk__in=[])
+
+
+def compile_filter(model_class, body, string_lookup=None) -> Q:
+    """
+    按编译后的过滤计划生成 Q 对象
+    - 数值、布尔、外键及枚举字段使用 exact / in，可走索引
+    - 字符串字段使用配置的匹配方式
+    - 时间范围使用 range，其他字段保持 icontains
+    """
+    string_lookup = string_lookup or get_setting("FILTER", "STRING_LOOKUP", "icontains")
+    filter_conditions = Q()
+    for key, name, field, kind, is_time in compile_filter_plan(
+        model_class, body.keys(), string_lookup
+    ):
+        value = body[key]
+        if is_time and isinstance(value, list) and len(value) == 2:
+            filter_conditions &= Q(**{f"{name}__range": (value[0], value[1])})
+        elif kind == KIND_EXACT:
+            if value in (None, ""):
+                continue
+            filter_conditions &= _exact_condition(name, field, value)
+        elif kind == KIND_STRING:
+            filter_conditions &= Q(**{f"{name}__{string_lookup}": value})
+        else:
+            filter_conditions &= Q(**{f"{name}__icontains": value})
+    return filter_conditions
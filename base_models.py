@@ -1,7 +1,76 @@
 from datetime import datetime, timezone
-from django.db import models
+from django.db import models, transaction
+from django.db.models import Q
 from rest_framework import serializers
-from .utils import format_datetime
+from .db_router import pin_primary
+from .utils import format_datetime, get_redis_cli, get_setting
+from .log import logger
+
+
+def _version_key(model_class) -> str:
+    return f"model_version:{model_class._meta.db_table}"
+
+
+def get_model_version(model_class) -> int:
+    """
+    获取模型数据版本号，未写入过时为 0
+    """
+    version = get_redis_cli().get(_version_key(model_class))
+    return int(version) if version is not None else 0
+
+
+def bump_model_version(model_class, using=None):
+    """
+    模型数据变更后递增版本号，该模型的查询结果缓存随之失效，无需扫描删除
+
+    位于事务中时在提交后递增，避免提交前读到旧数据的请求以新版本号写入缓存
+    未启用 settings.RESULT_CACHE 时不访问缓存
+    """
+    if not get_setting("RESULT_CACHE", "ENABLED", False):
+        return
+
+    def _bump():
+        try:
+            get_redis_cli().incr(_version_key(model_class))
+        except Exception as e:
+            # 数据已写入，缓存不可用不影响调用方
+            logger.warning(f"模型版本递增失败: {str(e)}")
+
+    transaction.on_commit(_bump, using=using)
+
+
+def after_model_write(model_class, using=None):
+    """
+    模型数据写入后调用：递增查询结果缓存版本号，当前请求/会话固定读取主库以读到自己的写入
+    """
+    bump_model_version(model_class, using=using)
+    pin_primary()
+
+
+# 未删除数据：is_delete 为空或不等于 1
+LIVE_Q = ~Q(is_delete=1)
+LIVE_SQL = "(is_delete IS NULL OR is_delete <> 1)"
+
+
+class LiveManager(models.Manager):
+    """
+    objects 管理器，只返回未删除的数据
+    """
+
+    def get_queryset(self):
+        return super().get_queryset().filter(LIVE_Q)
+
+
+def live_index(*fields, name):
+    """
+    只包含未删除数据的部分索引，在子类 Meta.indexes 中使用
+
+    PostgreSQL/SQLite 创建部分索引，MySQL 不支持带条件的索引，迁移时会跳过
+
+    class Meta(BaseModel.Meta):
+        indexes = BaseModel.Meta.indexes + [live_index("org_id", "code", name="user_live_code_idx")]
+    """
+    return models.Index(fields=list(fields), name=name, condition=LIVE_Q)
 
 
 # 基础字段
@@ -14,12 +83,31 @@ class BaseModel(models.Model):
     updater = models.CharField(verbose_name="更新人", max_length=128)
     org_id = models.IntegerField(verbose_name="所属机构")
     is_delete = models.IntegerField(
-        verbose_name="是否删除 1.删除 0.未删除", blank=True, null=True, db_index=True
+        verbose_name="是否删除 1.删除 0.未删除", blank=True, null=True
     )
 
+    # objects 只查询未删除数据，包含已删除数据时使用 all_objects
+    # all_objects 先声明，作为 _default_manager：唯一性校验（DRF UniqueValidator）、
+    # 关联查询等框架内部逻辑仍能看到已删除数据
+    all_objects = models.Manager()
+    objects = LiveManager()
+
     class Meta:
         # 抽象类， 用于继承，迁移的时候不创建
         abstract = True
+        # 机构范围 + 删除状态 + 创建时间，覆盖按机构过滤、按创建时间排序的列表查询
+        # 子类自定义 Meta 时需继承 BaseModel.Meta
+        indexes = [models.Index(fields=["org_id", "is_delete", "create_time"])]
+
+    # 不使用 post_save / post_delete 信号，以免所有模型的批量删除失去快速删除路径
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        after_model_write(type(self), using=self._state.db)
+
+    def delete(self, using=None, keep_parents=False):
+        result = super().delete(using=using, keep_parents=keep_parents)
+        after_model_write(type(self), using=using or self._state.db)
+        return result
 
 
 class BaseModelSerializer(serializers.ModelSerializer):
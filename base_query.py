@@ -1,15 +1,30 @@
-from collections import deque
 import random
-from typing import List, Set
-from django.db import DatabaseError, connection
+import sys
+from array import array
+from asgiref.sync import sync_to_async
+from typing import Dict, Iterable, List, Optional, Set
+from django.db import DatabaseError, connections, transaction
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
 from django.http import HttpRequest
 from redis import RedisError
+from .base_cursor import InvalidCursor, decode_cursor, get_cursor_ordering, get_seek_filter
+from .base_filter import compile_filter
+from .keyword_search import get_keyword_filter
+from .base_models import LIVE_Q, LIVE_SQL
+from .db_router import get_read_db, pin_model, pin_primary
 from .org import Org
+from .org_index import aget_org_index, get_org_index, invalidate_org_index
+from .org_path import get_org_path_filter
 from django.db.models import Q
+from rest_framework.exceptions import ParseError
 from rest_framework.parsers import JSONParser
 
-from .utils import camel_to_snake, get_redis_cli
-from .log import logger
+from .metrics import incr, record_cache, timed
+from .redis_context import take_prefetched
+from .singleflight import coalesce
+from .utils import camel_to_snake, get_async_redis_cli, get_redis_cli, get_setting
+from .log import logger, payload
 
 
 def get_sorter(body):
@@ -83,12 +98,14 @@ def is_valid_time_range(key, value):
     return False
 
 
-def get_filter(body, keyword_fields=[]):
+def get_filter(body, keyword_fields=[], model=None, string_lookup=None):
     """
     解析请求体中的过滤条件，并生成 Django ORM 的 Q 对象。
 
     :param body: dict 包含过滤条件的字典
     :param keyword_fields: list 包含需要进行关键字模糊查询的字段名
+    :param model: 模型类，传入时按字段类型生成 exact / in 等可走索引的条件
+    :param string_lookup: 传入 model 时字符串字段的匹配方式，如 istartswith
     :return: Q 对象，用于过滤查询
     """
     filter_conditions = Q()
@@ -97,11 +114,11 @@ def get_filter(body, keyword_fields=[]):
         keywords = body.pop("keywords", None)
 
         if keywords and keyword_fields:
-            keyword_condition = Q()
-            for field in keyword_fields:
-                field = camel_to_snake(field)
-                keyword_condition |= Q(**{f"{field}__icontains": keywords})
-            filter_conditions &= keyword_condition
+            # 已注册全文检索的模型走检索后端，否则各字段 icontains
+            filter_conditions &= get_keyword_filter(model, keyword_fields, keywords)
+
+    if model is not None:
+        return filter_conditions & compile_filter(model, body, string_lookup)
 
     for k, v in body.items():
         if is_valid_time_range(k, v):
@@ -115,15 +132,119 @@ def get_filter(body, keyword_fields=[]):
     return filter_conditions
 
 
+# 同时覆盖旧版本 SET 格式的 auth_org_ids:{id} 与当前格式的 auth_org_ids:v2:{id}
+ORG_CACHE_KEY_PATTERNS = ("auth_org_ids:*", "org_parent:*")
+# 降级查询的最大层级深度
+ORG_MAX_DEPTH = 64
+# IN 列表单次最大长度
+IN_CHUNK_SIZE = 1000
+
+
+def org_set_key(org_id) -> str:
+    """
+    机构子机构ID集合的缓存键，打包格式使用独立的 v2 命名空间，
+    滚动发布期间新旧版本进程不会读写同一个键
+    """
+    return f"auth_org_ids:v2:{org_id}"
+
+
+def _org_connection():
+    """
+    机构层级查询使用的数据库连接：配置从库时读从库，写入后及机构缓存失效后的固定期间读主库
+    """
+    return connections[get_read_db(Org)]
+
+
+def _unlink_keys(keys, batch_size=500):
+    """
+    使用管道批量 UNLINK 缓存键
+    """
+    keys = list(keys)
+    if not keys:
+        return
+    pipe = get_redis_cli().pipeline(transaction=False)
+    for i in range(0, len(keys), batch_size):
+        pipe.unlink(*keys[i : i + batch_size])
+    pipe.execute()
+
+
 def delete_user_organizations():
     """
     删除所有机构缓存
     """
-    keys = get_redis_cli().scan_iter("auth_org_ids_*")
-    for key in keys:
-        get_redis_cli().delete(key)
+    pin_model(Org)
+    cli = get_redis_cli()
+    for pattern in ORG_CACHE_KEY_PATTERNS:
+        batch = []
+        for key in cli.scan_iter(pattern, count=1000):
+            batch.append(key)
+            if len(batch) >= 1000:
+                _unlink_keys(batch)
+                batch = []
+        _unlink_keys(batch)
+    invalidate_org_index()
+
+
+def collect_org_cache_keys(org_id, parent_ids=()) -> Set[str]:
+    """
+    计算机构新增、修改、移动或删除时受影响的缓存键
+
+    :param org_id: 发生变更的机构ID
+    :param parent_ids: 变更前后的上级机构ID
+    :return: 需要失效的缓存键集合
+    """
+    # 机构写入前后计算，需读取主库的最新层级
+    pin_primary()
+    keys = {org_set_key(org_id), f"{org_set_key(org_id)}:stale"}
+    # 所有祖先机构的子机构集合都包含该机构
+    for parent_id in set(parent_ids):
+        if parent_id is None:
+            continue
+        for ancestor_id in _query_parent_chain(parent_id, include_deleted=True):
+            keys.add(org_set_key(ancestor_id))
+            keys.add(f"{org_set_key(ancestor_id)}:stale")
+    # 滚动发布期间旧版本进程仍读取旧命名空间，一并失效
+    keys |= {key.replace(":v2:", ":", 1) for key in keys}
+    # 子树内所有机构的父机构链都经过该机构
+    for child_id in _query_subtree_ids(org_id) | {org_id}:
+        keys.add(f"org_parent:{child_id}")
+        keys.add(f"org_parent:{child_id}:stale")
+    return keys
+
+
+def invalidate_org_cache_keys(keys):
+    """
+    失效指定的机构缓存键，并标记进程内层级索引过期
+    """
+    invalidate_org_index()
+    # 从库追上之前的回源读取主库，避免旧层级被重新缓存
+    pin_model(Org)
+    try:
+        _unlink_keys(keys)
+    except RedisError as e:
+        logger.warning(f"机构缓存失效失败: {str(e)}")
+
+
+def get_org_scope_filter(org_id, field="org_id") -> Q:
+    """
+    生成用户可访问机构范围的过滤条件
 
+    配置项 settings.ORG_SCOPE:
+    - MODE: 范围条件生成方式，默认 in
+      - in: 展开所在机构及子机构ID，field IN (1, 2, ...)
+      - path: 按机构物化路径子查询，无需展开ID列表，启用前需执行 rebuild_org_paths 回填
 
+    :param org_id: 用户所在机构
+    :param field: 数据所属机构字段
+    """
+    if get_setting("ORG_SCOPE", "MODE", "in") == "path":
+        if (scope := get_org_path_filter(org_id, field)) is not None:
+            return scope
+    # 排序保证生成的 SQL 稳定，便于按查询条件缓存
+    return Q(**{f"{field}__in": sorted(get_user_organizations(org_id))})
+
+
+@timed("org_lookup_seconds", kind="subtree")
 def get_user_organizations(org_id: int) -> Set[int]:
     """
     获取用户所在机构及其所有子机构的ID集合（SQL优化版）
@@ -133,19 +254,107 @@ def get_user_organizations(org_id: int) -> Set[int]:
     3. 防御性编程
     4. 性能优化
     """
-    redis_key = f"auth_org_ids:{org_id}"
+    # ========================== 0. 进程内层级索引 ==========================
+    index = get_org_index()
+    if index is not None:
+        hit = org_id in index
+        record_cache("org_index", hit)
+        if hit:
+            return set(index.descendants(org_id))
+
+    redis_key = org_set_key(org_id)
 
     # ========================== 1. 尝试从缓存获取 ==========================
-    if cached := get_redis_cli().smembers(redis_key):
-        logger.info(f"[缓存命中] 机构{org_id}子机构列表")
-        return {int(org_id_str) for org_id_str in cached}
+    cached = _read_org_set(redis_key)
+    record_cache("org_subtree", cached is not None)
+    if cached is not None:
+        logger.debug("[缓存命中] 机构%s子机构列表", org_id)
+        return cached
+
+    logger.info("[缓存未命中] 开始查询机构%s层级数据", org_id)
 
-    logger.info(f"[缓存未命中] 开始查询机构{org_id}层级数据")
+    # ========================== 2. 合并回源：数据库递归查询并写缓存 ==========================
+    org_set = coalesce(
+        redis_key,
+        read=lambda: _read_org_set(redis_key),
+        compute=lambda: _query_subtree_ids(org_id),
+        write=lambda value: _write_org_set(redis_key, value),
+        read_stale=lambda: _read_org_set(f"{redis_key}:stale"),
+    )
+    return set(org_set)
+
+
+_NOT_PREFETCHED = object()
+# 机构ID集合缓存格式：1 字节版本号 + 升序排列的 uint32 小端数组
+_ORG_SET_FORMAT = b"\x01"
+
+
+def _pack_org_ids(org_ids) -> bytes:
+    packed = array("I", sorted(org_ids))
+    if sys.byteorder == "big":
+        packed.byteswap()
+    return _ORG_SET_FORMAT + packed.tobytes()
+
+
+def _unpack_org_ids(blob: bytes) -> Set[int]:
+    packed = array("I")
+    packed.frombytes(blob[len(_ORG_SET_FORMAT) :])
+    if sys.byteorder == "big":
+        packed.byteswap()
+    return set(packed)
+
+
+def _read_org_set(redis_key) -> Optional[Set[int]]:
+    """
+    读取缓存的机构ID集合，未命中返回 None
+    """
+    cached = take_prefetched("get", redis_key, _NOT_PREFETCHED)
+    if cached is _NOT_PREFETCHED:
+        cached = get_redis_cli().get(redis_key)
+    elif isinstance(cached, Exception):
+        raise cached
+    return _decode_org_set(cached)
 
-    # ========================== 2. 数据库递归查询 ==========================
-    org_set = set()
+
+def _decode_org_set(cached) -> Optional[Set[int]]:
+    if isinstance(cached, bytes) and cached.startswith(_ORG_SET_FORMAT):
+        return _unpack_org_ids(cached)
+    return None
+
+
+def _queue_org_set(pipe, redis_key, org_set):
+    """
+    在管道中加入机构ID集合缓存的写入命令
+    """
+    value = _pack_org_ids(org_set)
+    # 设置缓存过期时间(1小时)和随机抖动防止雪崩
+    ex_time = 3600 + random.randint(0, 300)
+    stale_ttl = get_setting("ORG_CACHE", "STALE_TTL", 0)
+    pipe.set(redis_key, value, ex=ex_time)
+    if stale_ttl:
+        # 旧副本在正式缓存过期后继续保留，供回源等待超时时使用
+        pipe.set(f"{redis_key}:stale", value, ex=ex_time + stale_ttl)
+
+
+def _write_org_set(redis_key, org_set):
+    """
+    原子写入机构ID集合缓存（MULTI/EXEC 保证正式缓存与旧副本同时生效）
+    """
+    try:
+        pipe = get_redis_cli().pipeline(transaction=True)
+        _queue_org_set(pipe, redis_key, org_set)
+        pipe.execute()
+    except RedisError as e:
+        logger.warning(f"Redis操作失败: {str(e)}")
+
+
+@timed("org_sql_seconds", kind="subtree")
+def _query_subtree_ids(org_id: int) -> Set[int]:
+    """
+    数据库递归查询机构及其所有子机构ID
+    """
     try:
-        with connection.cursor() as cursor:
+        with _org_connection().cursor() as cursor:
             # MySQL 8.0+ 递归查询语法
             recursive_sql = f"""
             WITH RECURSIVE org_tree AS (
@@ -160,7 +369,7 @@ def get_user_organizations(org_id: int) -> Set[int]:
             SELECT id FROM org_tree
             """
             cursor.execute(recursive_sql, [org_id])
-            org_set = {row[0] for row in cursor.fetchall()}
+            return {row[0] for row in cursor.fetchall()}
 
     except DatabaseError as e:
         # 数据库不支持递归查询时降级处理
@@ -169,48 +378,51 @@ def get_user_organizations(org_id: int) -> Set[int]:
         logger.error(f"数据库查询失败: {str(e)}")
         raise
 
-    # ========================== 3. 缓存处理 ==========================
-    if org_set:
-        # 转换为字符串列表存储
-        org_str_list = [str(org_id) for org_id in org_set]
-        try:
-            # 设置缓存过期时间(1小时)和随机抖动防止雪崩
-            ex_time = 3600 + random.randint(0, 300)
-            get_redis_cli().sadd(redis_key, *org_str_list)
-            get_redis_cli().expire(redis_key, ex_time)
-        except RedisError as e:
-            logger.warning(f"Redis操作失败: {str(e)}")
-
-    return org_set
-
 
 def _fallback_org_query(root_id: int) -> Set[int]:
-    """递归查询降级方案"""
-    org_set = set()
-    queue = deque([root_id])
-    max_depth = 20  # 防止恶意数据导致无限循环
-
-    with connection.cursor() as cursor:
+    """
+    递归查询降级方案：按层广度优先展开，每层一次 org_id IN (...) 查询
+    1. 往返次数为 O(层级深度)，IN 列表超长时分批
+    2. 深度上限为真实层级深度（settings.ORG_CACHE["MAX_DEPTH"]，默认 64）
+    3. 已访问节点不再展开，防止循环引用
+    """
+    root_id = int(root_id)
+    max_depth = get_setting("ORG_CACHE", "MAX_DEPTH", ORG_MAX_DEPTH)
+    table = Org._meta.db_table
+
+    with _org_connection().cursor() as cursor:
+        # 与递归查询一致：机构不存在时返回空集合
+        cursor.execute(f"SELECT id FROM {table} WHERE id = %s", [root_id])
+        if cursor.fetchone() is None:
+            return set()
+
+        org_set = {root_id}
+        frontier = [root_id]
         for _ in range(max_depth):
-            if not queue:
+            if not frontier:
                 break
-
-            current_id = queue.popleft()
-            if current_id in org_set:
-                continue
-
-            org_set.add(current_id)
-
-            # 查询直接子机构
-            cursor.execute(
-                f"SELECT id FROM {Org._meta.db_table} WHERE org_id = %s", [current_id]
-            )
-            children = [row[0] for row in cursor.fetchall()]
-            queue.extend(children)
+            next_frontier = []
+            for i in range(0, len(frontier), IN_CHUNK_SIZE):
+                part = frontier[i : i + IN_CHUNK_SIZE]
+                placeholders = ", ".join(["%s"] * len(part))
+                cursor.execute(
+                    f"SELECT id FROM {table} WHERE org_id IN ({placeholders})", part
+                )
+                for (child_id,) in cursor.fetchall():
+                    if child_id in org_set:
+                        logger.warning(f"检测到机构循环引用: {child_id}")
+                        continue
+                    org_set.add(child_id)
+                    next_frontier.append(child_id)
+            frontier = next_frontier
+
+        if frontier:
+            logger.warning(f"机构{root_id}层级超过最大深度{max_depth}，结果已截断")
 
     return org_set
 
 
+@timed("org_lookup_seconds", kind="parents")
 def get_all_parent_orgs(org_id) -> List[int]:
     """
     获取机构及所有父机构ID（优化版）
@@ -220,89 +432,438 @@ def get_all_parent_orgs(org_id) -> List[int]:
     3. 防御性编程增强
     4. 数据库兼容性处理
     """
+    # ==================== 进程内层级索引 ====================
+    index = get_org_index()
+    if index is not None:
+        hit = org_id in index
+        record_cache("org_index", hit)
+        if hit:
+            return index.ancestors(org_id)
+
     # ==================== 缓存检查 ====================
     redis_key = f"org_parent:{org_id}"
-    if cached := get_redis_cli().lrange(redis_key, 0, -1):
-        logger.info(f"[缓存命中] 机构{org_id}父机构链")
-        return [id_str for id_str in cached]
+    cached = _read_org_chain(redis_key)
+    record_cache("org_parent", cached is not None)
+    if cached is not None:
+        logger.debug("[缓存命中] 机构%s父机构链", org_id)
+        return cached
+
+    # ==================== 合并回源：数据库查询并写缓存 ====================
+    org_ids = coalesce(
+        redis_key,
+        read=lambda: _read_org_chain(redis_key),
+        compute=lambda: _query_parent_chain(org_id),
+        write=lambda value: _write_org_chain(redis_key, value),
+        read_stale=lambda: _read_org_chain(f"{redis_key}:stale"),
+    )
+    return list(org_ids)
+
+
+def _read_org_chain(redis_key) -> Optional[List[int]]:
+    """
+    读取缓存的父机构链，未命中返回 None
+    """
+    return _decode_org_chain(get_redis_cli().lrange(redis_key, 0, -1))
+
+
+def _decode_org_chain(cached) -> Optional[List[int]]:
+    if cached and not isinstance(cached, Exception):
+        return [int(id_str) for id_str in cached]
+    return None
 
-    # ==================== 数据库查询 ====================
-    org_ids = []
+
+def _queue_org_chain(pipe, redis_key, org_ids):
+    """
+    在管道中加入父机构链缓存的写入命令，先删后写避免并发回填导致链重复
+    """
+    # 设置缓存带随机过期时间（30分钟±5分钟）
+    ex_time = 1800 + random.randint(-300, 300)
+    stale_ttl = get_setting("ORG_CACHE", "STALE_TTL", 0)
+    pipe.delete(redis_key)
+    pipe.rpush(redis_key, *map(str, org_ids))
+    pipe.expire(redis_key, ex_time)
+    if stale_ttl:
+        stale_key = f"{redis_key}:stale"
+        pipe.delete(stale_key)
+        pipe.rpush(stale_key, *map(str, org_ids))
+        pipe.expire(stale_key, ex_time + stale_ttl)
+
+
+def _write_org_chain(redis_key, org_ids):
+    """
+    原子写入父机构链缓存
+    """
     try:
-        with connection.cursor() as cursor:
+        pipe = get_redis_cli().pipeline(transaction=True)
+        _queue_org_chain(pipe, redis_key, org_ids)
+        pipe.execute()
+    except Exception as e:
+        logger.warning(f"缓存写入失败: {str(e)}")
+
+
+@timed("org_sql_seconds", kind="parents")
+def _query_parent_chain(org_id: int, include_deleted=False) -> List[int]:
+    """
+    数据库递归查询机构及所有父机构ID
+
+    :param include_deleted: 是否沿已删除的机构继续向上查询
+    """
+    live_sql = "" if include_deleted else f"AND {LIVE_SQL}"
+    live_join_sql = (
+        "" if include_deleted else "WHERE (so.is_delete IS NULL OR so.is_delete <> 1)"
+    )
+    try:
+        with _org_connection().cursor() as cursor:
             # MySQL 8.0+/PostgreSQL 递归查询
             recursive_sql = f"""
             WITH RECURSIVE org_chain AS (
                 SELECT id, org_id
                 FROM {Org._meta.db_table}
-                WHERE id = %s AND is_delete IS NULL
+                WHERE id = %s {live_sql}
                 UNION ALL
                 SELECT so.id, so.org_id
                 FROM {Org._meta.db_table} so
                 INNER JOIN org_chain oc ON so.id = oc.org_id
-                WHERE so.is_delete IS NULL
+                {live_join_sql}
             )
             SELECT id FROM org_chain
             """
             cursor.execute(recursive_sql, [org_id])
-            org_ids = [row[0] for row in cursor.fetchall()]
+            return [row[0] for row in cursor.fetchall()]
 
     except DatabaseError as e:
         if "syntax" in str(e).lower():
-            return _fallback_parent_query(org_id)
+            return _fallback_parent_query(org_id, include_deleted)
         logger.error(f"递归查询失败: {str(e)}")
         raise
 
-    # ==================== 缓存处理 ====================
-    if org_ids:
-        try:
-            # 设置缓存带随机过期时间（30分钟±5分钟）
-            ex_time = 1800 + random.randint(-300, 300)
-            get_redis_cli().rpush(redis_key, *map(str, org_ids))
-            get_redis_cli().expire(redis_key, ex_time)
-        except Exception as e:
-            logger.warning(f"缓存写入失败: {str(e)}")
-
-    return org_ids
 
-
-def _fallback_parent_query(org_id: int) -> List[int]:
-    """降级方案：迭代查询"""
+def _fallback_parent_query(org_id: int, include_deleted=False) -> List[int]:
+    """
+    降级方案：逐层向上查询，顺序与递归查询一致（自身在前、根机构在后）
+    """
     org_chain = []
-    current_id = org_id
-    max_depth = 20  # 防止死循环
+    current_id = int(org_id)
+    max_depth = get_setting("ORG_CACHE", "MAX_DEPTH", ORG_MAX_DEPTH)
+    live_sql = "" if include_deleted else f"AND {LIVE_SQL}"
 
-    with connection.cursor() as cursor:
+    with _org_connection().cursor() as cursor:
         for _ in range(max_depth):
+            if current_id in org_chain:  # 循环检测
+                logger.warning(f"检测到机构循环引用: {org_chain}")
+                break
+
             cursor.execute(
-                f"SELECT org_id FROM {Org._meta.db_table} WHERE id = %s AND is_delete IS NULL",
+                f"SELECT org_id FROM {Org._meta.db_table} WHERE id = %s {live_sql}",
                 [current_id],
             )
             row = cursor.fetchone()
-
-            if not row or row[0] is None:
-                org_chain.append(current_id)
-                break
-
-            if current_id in org_chain:  # 循环检测
-                logger.warning(f"检测到机构循环引用: {org_chain}")
+            if not row:
                 break
 
             org_chain.append(current_id)
+            if row[0] is None:
+                break
             current_id = row[0]
+        else:
+            logger.warning(f"机构{org_id}层级超过最大深度{max_depth}，结果已截断")
+
+    return org_chain
+
+
+@timed("org_lookup_seconds", kind="subtree_batch")
+def get_user_organizations_many(org_ids: Iterable[int]) -> Dict[int, Set[int]]:
+    """
+    批量获取多个机构及其所有子机构的ID集合
+    1. 管道批量读取缓存
+    2. 未命中的机构合并为一次递归查询
+    3. 管道批量回填缓存
+
+    :return: {机构ID: 子机构ID集合}，不存在的机构对应空集合
+    """
+    org_ids = list(dict.fromkeys(int(org_id) for org_id in org_ids))
+    result: Dict[int, Set[int]] = {}
+
+    index = get_org_index()
+    if index is not None:
+        for org_id in org_ids:
+            if org_id in index:
+                result[org_id] = set(index.descendants(org_id))
+        incr("cache_requests_total", len(result), cache="org_index", result="hit")
+        org_ids = [org_id for org_id in org_ids if org_id not in result]
+        incr("cache_requests_total", len(org_ids), cache="org_index", result="miss")
+    if not org_ids:
+        return result
+
+    # ==================== 1. 管道批量读取缓存 ====================
+    pipe = get_redis_cli().pipeline(transaction=False)
+    for org_id in org_ids:
+        pipe.get(org_set_key(org_id))
+    misses = []
+    for org_id, cached in zip(org_ids, pipe.execute(raise_on_error=False)):
+        if (org_set := _decode_org_set(cached)) is not None:
+            result[org_id] = org_set
+        else:
+            misses.append(org_id)
+    incr("cache_requests_total", len(org_ids) - len(misses), cache="org_subtree", result="hit")
+    incr("cache_requests_total", len(misses), cache="org_subtree", result="miss")
+    if not misses:
+        return result
+    logger.info("[缓存未命中] 批量查询%s个机构层级数据", len(misses))
+
+    # ==================== 2. 一次递归查询全部未命中机构 ====================
+    computed = _query_subtrees(misses)
+
+    # ==================== 3. 管道批量回填 ====================
+    try:
+        pipe = get_redis_cli().pipeline(transaction=True)
+        for org_id, org_set in computed.items():
+            if org_set:
+                _queue_org_set(pipe, org_set_key(org_id), org_set)
+        pipe.execute()
+    except RedisError as e:
+        logger.warning(f"Redis操作失败: {str(e)}")
+
+    for org_id in misses:
+        result[org_id] = computed.get(org_id, set())
+    return result
+
+
+@timed("org_sql_seconds", kind="subtree_batch")
+def _query_subtrees(root_ids: List[int]) -> Dict[int, Set[int]]:
+    """
+    一次递归查询多个机构的子树，IN 列表超长时分批
+    """
+    subtrees: Dict[int, Set[int]] = {root_id: set() for root_id in root_ids}
+    try:
+        with _org_connection().cursor() as cursor:
+            for i in range(0, len(root_ids), IN_CHUNK_SIZE):
+                part = root_ids[i : i + IN_CHUNK_SIZE]
+                placeholders = ", ".join(["%s"] * len(part))
+                recursive_sql = f"""
+                WITH RECURSIVE org_tree AS (
+                    SELECT id AS root_id, id
+                    FROM {Org._meta.db_table}
+                    WHERE id IN ({placeholders})
+                    UNION ALL
+                    SELECT ot.root_id, o.id
+                    FROM {Org._meta.db_table} o
+                    INNER JOIN org_tree ot ON o.org_id = ot.id
+                )
+                SELECT root_id, id FROM org_tree
+                """
+                cursor.execute(recursive_sql, part)
+                for root_id, org_id in cursor.fetchall():
+                    subtrees[root_id].add(org_id)
+
+    except DatabaseError as e:
+        if "syntax" in str(e).lower():
+            return {root_id: _fallback_org_query(root_id) for root_id in root_ids}
+        logger.error(f"数据库查询失败: {str(e)}")
+        raise
+    return subtrees
+
 
-    return org_chain[::-1]  # 反转保证根节点在前
+@timed("org_lookup_seconds", kind="parents_batch")
+def get_all_parent_orgs_many(org_ids: Iterable[int]) -> Dict[int, List[int]]:
+    """
+    批量获取多个机构及其所有父机构ID，缓存读取与回填均使用管道
+
+    :return: {机构ID: 父机构链}，链中自身在前、根机构在后
+    """
+    org_ids = list(dict.fromkeys(int(org_id) for org_id in org_ids))
+    result: Dict[int, List[int]] = {}
+
+    index = get_org_index()
+    if index is not None:
+        for org_id in org_ids:
+            if org_id in index:
+                result[org_id] = index.ancestors(org_id)
+        incr("cache_requests_total", len(result), cache="org_index", result="hit")
+        org_ids = [org_id for org_id in org_ids if org_id not in result]
+        incr("cache_requests_total", len(org_ids), cache="org_index", result="miss")
+    if not org_ids:
+        return result
+
+    # ==================== 1. 管道批量读取缓存 ====================
+    pipe = get_redis_cli().pipeline(transaction=False)
+    for org_id in org_ids:
+        pipe.lrange(f"org_parent:{org_id}", 0, -1)
+    misses = []
+    # 单个命令出错时结果为异常对象，按未命中处理
+    for org_id, cached in zip(org_ids, pipe.execute(raise_on_error=False)):
+        if (chain := _decode_org_chain(cached)) is not None:
+            result[org_id] = chain
+        else:
+            misses.append(org_id)
+    incr("cache_requests_total", len(org_ids) - len(misses), cache="org_parent", result="hit")
+    incr("cache_requests_total", len(misses), cache="org_parent", result="miss")
+    if not misses:
+        return result
+
+    # ==================== 2. 一次递归查询全部未命中机构 ====================
+    computed = _query_parent_chains(misses)
+
+    # ==================== 3. 管道批量回填 ====================
+    try:
+        pipe = get_redis_cli().pipeline(transaction=True)
+        for org_id, chain in computed.items():
+            if chain:
+                _queue_org_chain(pipe, f"org_parent:{org_id}", chain)
+        pipe.execute()
+    except Exception as e:
+        logger.warning(f"缓存写入失败: {str(e)}")
+
+    for org_id in misses:
+        result[org_id] = computed.get(org_id, [])
+    return result
+
+
+@timed("org_sql_seconds", kind="parents_batch")
+def _query_parent_chains(root_ids: List[int]) -> Dict[int, List[int]]:
+    """
+    一次递归查询多个机构的父机构链，按层级排序
+    """
+    chains: Dict[int, List[int]] = {root_id: [] for root_id in root_ids}
+    try:
+        with _org_connection().cursor() as cursor:
+            for i in range(0, len(root_ids), IN_CHUNK_SIZE):
+                part = root_ids[i : i + IN_CHUNK_SIZE]
+                placeholders = ", ".join(["%s"] * len(part))
+                recursive_sql = f"""
+                WITH RECURSIVE org_chain AS (
+                    SELECT id AS root_id, id, org_id, 0 AS depth
+                    FROM {Org._meta.db_table}
+                    WHERE id IN ({placeholders}) AND {LIVE_SQL}
+                    UNION ALL
+                    SELECT oc.root_id, so.id, so.org_id, oc.depth + 1
+                    FROM {Org._meta.db_table} so
+                    INNER JOIN org_chain oc ON so.id = oc.org_id
+                    WHERE (so.is_delete IS NULL OR so.is_delete <> 1)
+                )
+                SELECT root_id, id FROM org_chain ORDER BY root_id, depth
+                """
+                cursor.execute(recursive_sql, part)
+                for root_id, org_id in cursor.fetchall():
+                    chains[root_id].append(org_id)
+
+    except DatabaseError as e:
+        if "syntax" in str(e).lower():
+            return {root_id: _fallback_parent_query(root_id) for root_id in root_ids}
+        logger.error(f"递归查询失败: {str(e)}")
+        raise
+    return chains
+
+
+async def aget_user_organizations(org_id: int) -> Set[int]:
+    """
+    get_user_organizations 的异步版本（ASGI）
+
+    进程内索引与 Redis 缓存命中时不切换线程；未命中时在线程中执行同步查询
+    """
+    index = await aget_org_index()
+    if index is not None:
+        hit = org_id in index
+        record_cache("org_index", hit)
+        if hit:
+            return set(index.descendants(org_id))
+
+    redis_key = org_set_key(org_id)
+    try:
+        cached = await get_async_redis_cli().get(redis_key)
+    except RedisError as e:
+        logger.warning(f"Redis操作失败: {str(e)}")
+        cached = None
+    org_set = _decode_org_set(cached)
+    record_cache("org_subtree", org_set is not None)
+    if org_set is not None:
+        logger.debug("[缓存命中] 机构%s子机构列表", org_id)
+        return org_set
+    return await sync_to_async(get_user_organizations)(org_id)
+
+
+async def aget_all_parent_orgs(org_id) -> List[int]:
+    """
+    get_all_parent_orgs 的异步版本（ASGI）
+    """
+    index = await aget_org_index()
+    if index is not None:
+        hit = org_id in index
+        record_cache("org_index", hit)
+        if hit:
+            return index.ancestors(org_id)
+
+    redis_key = f"org_parent:{org_id}"
+    try:
+        cached = await get_async_redis_cli().lrange(redis_key, 0, -1)
+    except RedisError as e:
+        logger.warning(f"Redis操作失败: {str(e)}")
+        cached = None
+    chain = _decode_org_chain(cached)
+    record_cache("org_parent", chain is not None)
+    if chain is not None:
+        logger.debug("[缓存命中] 机构%s父机构链", org_id)
+        return chain
+    return await sync_to_async(get_all_parent_orgs)(org_id)
+
+
+@receiver(post_save, sender=Org)
+def _invalidate_org_on_save(sender, instance, created, raw=False, using=None, **kwargs):
+    """
+    机构新增、移动或删除状态变化时，定向失效受影响的祖先/后代缓存
+    """
+    if raw:
+        return
+    # 保存前的值由 org_path 的 pre_save 记录
+    prev = getattr(instance, "_org_prev", None)
+    if not created and prev and prev[:2] == (instance.org_id, instance.is_delete):
+        # 层级未变化
+        return
+    parent_ids = {instance.org_id}
+    if prev:
+        parent_ids.add(prev[0])
+    org_id = instance.pk
+    transaction.on_commit(
+        lambda: invalidate_org_cache_keys(collect_org_cache_keys(org_id, parent_ids)),
+        using=using,
+    )
+
+
+@receiver(pre_delete, sender=Org)
+def _collect_org_keys_on_delete(sender, instance, using=None, **kwargs):
+    """
+    删除前计算受影响的缓存键，删除后子树已无法查询
+    """
+    instance._org_cache_keys = collect_org_cache_keys(instance.pk, [instance.org_id])
+
+
+@receiver(post_delete, sender=Org)
+def _invalidate_org_on_delete(sender, instance, using=None, **kwargs):
+    keys = getattr(instance, "_org_cache_keys", None) or set()
+    transaction.on_commit(lambda: invalidate_org_cache_keys(keys), using=using)
 
 
 def getBaseParams(
-    request: HttpRequest, keyword_fields=[], allowed_org_ids=None, no_is_delete=False
+    request: HttpRequest,
+    keyword_fields=[],
+    allowed_org_ids=None,
+    no_is_delete=False,
+    cursor_mode=False,
+    model=None,
 ):
     """
     获取基础参数
+
+    :param no_is_delete: 为 True 时不过滤删除状态，查询需使用 Model.all_objects，
+                         Model.objects 始终排除已删除数据
+    :param model: 模型类，传入时按字段类型编译过滤条件，见 get_filter
+
+    :param cursor_mode: 游标分页模式，排序补充 id 列，查询条件包含请求中 cursor 的定位条件，
+                        返回值中的 page 替换为 cursor，配合 paginate_by_cursor 使用
     """
     # 获取查询参数
     body = JSONParser().parse(request)
-    logger.info(f"获取到的参数: {body}")
+    logger.info("获取到的参数: %s", payload(body))
 
     # 处理分页参数
     limit = body.get("limit", 10)
@@ -312,23 +873,40 @@ def getBaseParams(
     sorter = get_sorter(body)
 
     if body.get("body") != None:
-        logger.info(f"body = {body.get('body')}")
-        query_data = get_filter(body.get("body"), keyword_fields)
+        logger.debug("body = %s", payload(body.get("body")))
+        query_data = get_filter(body.get("body"), keyword_fields, model)
     else:
         query_data = Q()
 
+    org_scope = None
     if not allowed_org_ids and allowed_org_ids != False:
         if request.user:
-            org_id = request.user.get("orgId")
-            allowed_org_ids = get_user_organizations(org_id)
-
-    if allowed_org_ids != False:
+            org_scope = get_org_scope_filter(request.user.get("orgId"))
+
+    if org_scope is not None:
+        query_data &= org_scope
+    elif allowed_org_ids != False:
+        if isinstance(allowed_org_ids, (set, frozenset)):
+            # 排序保证生成的 SQL 稳定，便于按查询条件缓存
+            allowed_org_ids = sorted(allowed_org_ids)
         query_data &= Q(org_id__in=allowed_org_ids)
 
     # id 不等于 "-1"
     # query_data &= ~Q(id="-1")
     if no_is_delete is False:
-        query_data &= ~Q(is_delete="1")
-
-    logger.info(f"查询条件 = {query_data}")
+        query_data &= LIVE_Q
+
+    if cursor_mode:
+        sorter = get_cursor_ordering(sorter)
+        cursor = body.get("cursor")
+        if cursor:
+            try:
+                query_data &= get_seek_filter(sorter, decode_cursor(cursor, sorter))
+            except InvalidCursor as e:
+                # 游标来自客户端，格式错误按请求参数错误返回 400
+                raise ParseError(str(e)) from e
+        logger.debug("查询条件 = %s", payload(query_data))
+        return (query_data, sorter, limit, cursor)
+
+    logger.debug("查询条件 = %s", payload(query_data))
     return (query_data, sorter, limit, page)
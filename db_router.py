@@ -0,0 +1,148 @@
+import math
+import random
+import time
+from contextvars import ContextVar
+
+from django.db import DEFAULT_DB_ALIAS, connections, router
+from redis import RedisError
+
+from .utils import get_redis_cli, get_setting
+from .log import logger
+
+# 当前请求/会话固定使用主库的截止时间(时间戳)
+_pinned_until: ContextVar[float] = ContextVar("db_pinned_until", default=0.0)
+
+PIN_COOKIE = "db_pin"
+
+
+def _replicas():
+    """
+    配置项 settings.DB_REPLICAS:
+    - ALIASES: 从库别名列表，默认 []，为空时所有读取使用主库
+    - PIN_SECONDS: 写入后固定使用主库的时长(秒)，应大于主从复制延迟，默认 5
+    """
+    return get_setting("DB_REPLICAS", "ALIASES", [])
+
+
+def _pin_seconds():
+    return get_setting("DB_REPLICAS", "PIN_SECONDS", 5)
+
+
+def pin_primary(seconds=None):
+    """
+    写入后调用：当前请求（及携带固定标记的后续请求）在一段时间内从主库读取，保证读到自己的写入
+    """
+    if not _replicas():
+        return
+    until = time.time() + (seconds or _pin_seconds())
+    if until > _pinned_until.get():
+        _pinned_until.set(until)
+
+
+def is_primary_pinned() -> bool:
+    return _pinned_until.get() > time.time()
+
+
+def pin_model(model_class, seconds=None):
+    """
+    所有 worker 在一段时间内从主库读取该模型，用于缓存失效后的回源，避免从库旧数据被重新缓存
+    """
+    if not _replicas():
+        return
+    try:
+        get_redis_cli().set(
+            f"db_pin:{model_class._meta.db_table}",
+            1,
+            px=int((seconds or _pin_seconds()) * 1000),
+        )
+    except RedisError as e:
+        logger.warning(f"主库固定标记写入失败: {str(e)}")
+
+
+def _model_pinned(model_class) -> bool:
+    try:
+        return bool(get_redis_cli().exists(f"db_pin:{model_class._meta.db_table}"))
+    except RedisError as e:
+        logger.warning(f"主库固定标记读取失败: {str(e)}")
+        return True
+
+
+def get_read_db(model_class) -> str:
+    """
+    获取原生 SQL 读取使用的数据库别名，规则与 ReplicaRouter 一致，并检查 pin_model 标记
+    """
+    if not _replicas():
+        return router.db_for_read(model_class)
+    if is_primary_pinned() or _model_pinned(model_class):
+        return DEFAULT_DB_ALIAS
+    return router.db_for_read(model_class)
+
+
+class ReplicaRouter:
+    """
+    读写分离路由：写入与事务内读取使用主库，其余读取随机分配到从库，
+    pin_primary 固定期间读取使用主库
+
+    DATABASE_ROUTERS = ["python_utils.db_router.ReplicaRouter"]
+    """
+
+    def db_for_read(self, model, **hints):
+        instance = hints.get("instance")
+        if instance is not None and instance._state.db:
+            return instance._state.db
+        replicas = _replicas()
+        if (
+            not replicas
+            or is_primary_pinned()
+            or connections[DEFAULT_DB_ALIAS].in_atomic_block
+        ):
+            return DEFAULT_DB_ALIAS
+        return random.choice(replicas)
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db in _replicas():
+            return False
+        return None
+
+
+class ReplicaPinMiddleware:
+    """
+    在请求间传递主库固定标记：写入后的请求设置 cookie，后续请求在固定期间内同样读取主库
+
+    MIDDLEWARE = [..., "python_utils.db_router.ReplicaPinMiddleware", ...]
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        try:
+            pinned_until = float(request.COOKIES.get(PIN_COOKIE, 0))
+        except ValueError:
+            pinned_until = 0.0
+        # cookie 由客户端提供：拒绝 inf/nan，固定时长不超过 PIN_SECONDS
+        if not math.isfinite(pinned_until):
+            pinned_until = 0.0
+        pinned_until = min(pinned_until, time.time() + _pin_seconds())
+        token = _pinned_until.set(pinned_until)
+        try:
+            response = self.get_response(request)
+            current = _pinned_until.get()
+        finally:
+            _pinned_until.reset(token)
+
+        if current > pinned_until and current > time.time():
+            response.set_cookie(
+                PIN_COOKIE,
+                f"{current:.3f}",
+                max_age=int(current - time.time()) + 1,
+                httponly=True,
+                samesite="Lax",
+            )
+        return response
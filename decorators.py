@@ -1,22 +1,155 @@
+import asyncio
+import threading
+import time
 from functools import wraps
 from django.http import JsonResponse
-from .utils import decode_token, get_redis_cli
+from .base_query import org_set_key
+from .local_cache import LocalCache
+from .metrics import record_cache, timed
+from .redis_context import get_request_redis
+from .utils import decode_token, get_async_redis_cli, get_redis_cli, get_setting
 from .log import logger
 
+# 用户缓存字段
+USER_KEYS = [
+    "id",
+    "createById",
+    "updateById",
+    "username",
+    "joinTime",
+    "orgName",
+    "orgId",
+    "phone",
+    "name",
+    "email",
+    "position",
+    "sex",
+    "status",
+    "createTime",
+    "updateTime",
+    "lastLoginTime",
+]
+
+_user_cache = None
+_user_cache_lock = threading.Lock()
+
+
+def _get_user_cache():
+    """
+    获取进程内用户缓存（L1），未启用时返回 None
+
+    配置项 settings.AUTH_USER_CACHE:
+    - ENABLED: 是否启用，默认 False
+    - MAX_SIZE: 最大条目数，默认 10000
+    - TTL: 有效期(秒)，默认 30
+    - CHANNEL: 用户变更通知频道，默认 auth_user:invalidate
+    """
+    global _user_cache
+
+    if not get_setting("AUTH_USER_CACHE", "ENABLED", False):
+        return None
+    if _user_cache is not None:
+        return _user_cache
+
+    with _user_cache_lock:
+        if _user_cache is None:
+            cache = LocalCache(
+                max_size=get_setting("AUTH_USER_CACHE", "MAX_SIZE", 10000),
+                ttl=get_setting("AUTH_USER_CACHE", "TTL", 30),
+            )
+            threading.Thread(
+                target=_listen_user_invalidation,
+                args=(cache,),
+                name="auth-user-cache-invalidation",
+                daemon=True,
+            ).start()
+            _user_cache = cache
+    return _user_cache
+
+
+def _listen_user_invalidation(cache: LocalCache):
+    """
+    订阅用户变更通知，删除对应用户的 L1 缓存
+    """
+    channel = get_setting("AUTH_USER_CACHE", "CHANNEL", "auth_user:invalidate")
+    while True:
+        try:
+            pubsub = get_redis_cli().pubsub(ignore_subscribe_messages=True)
+            pubsub.subscribe(channel)
+            # 订阅建立前的变更通知可能已丢失，清空本地缓存
+            cache.clear()
+            for message in pubsub.listen():
+                user_key = message["data"].decode()
+                cache.delete_where(lambda key: key[0] == user_key)
+        except Exception as e:
+            logger.warning(f"用户缓存失效订阅中断: {str(e)}")
+            cache.clear()
+            time.sleep(1)
+
+
+def invalidate_user_cache(org_id, user_id):
+    """
+    用户信息（user:{org_id}_{user_id}）变更后调用，通知所有 worker 删除 L1 缓存
+    """
+    user_key = f"user:{org_id}_{user_id}"
+    if _user_cache is not None:
+        _user_cache.delete_where(lambda key: key[0] == user_key)
+    channel = get_setting("AUTH_USER_CACHE", "CHANNEL", "auth_user:invalidate")
+    get_redis_cli().publish(channel, user_key)
+
+
+def _get_token(request):
+    """
+    从 cookie 或请求头中获取 token，请求头优先
+    """
+    token = None
+    if request.COOKIES.get("token"):
+        token = request.COOKIES.get("token")
+    if request.headers.get("token"):
+        token = request.headers.get("token")
+    return token
+
+
+def _fetch_user(user_key, org_id):
+    """
+    读取用户信息，请求上下文中同一次管道往返预读该用户所在机构的子机构缓存
+    """
+    ctx = get_request_redis()
+    if ctx is None:
+        return get_redis_cli().hmget(user_key, USER_KEYS)
+
+    commands = [("hmget", user_key, USER_KEYS)]
+    if not get_setting("ORG_INDEX", "ENABLED", False):
+        # 由 get_user_organizations 读取时使用
+        commands.append(("get", org_set_key(org_id)))
+    data = ctx.prefetch(commands)[0]
+    ctx.take("hmget", user_key)
+    if isinstance(data, Exception):
+        raise data
+    return data
+
+
+def _build_user(data):
+    user = {}
+    for i in range(len(USER_KEYS)):
+        user[USER_KEYS[i]] = data[i].decode() if data[i] else None
+    return user
+
 
 def auth_user():
     """
     验证用户授权
+
+    同时支持同步视图与 async def 视图，异步视图使用 redis.asyncio 读取用户信息
     """
 
     def decorator(view_func):
+        if asyncio.iscoroutinefunction(view_func):
+            return _async_auth_view(view_func)
+
         @wraps(view_func)
         def _wrapped_view(request, *args, **kwargs):
-            token = None
-            if request.COOKIES.get("token"):
-                token = request.COOKIES.get("token")
-            if request.headers.get("token"):
-                token = request.headers.get("token")
+            token = _get_token(request)
             if token is None:
                 return JsonResponse({"code": 401, "msg": "未登录"}, status=401)
             else:
@@ -27,31 +160,24 @@ def auth_user():
                 else:
                     id = payload.get("userId")
                     org_id = payload.get("orgId")
-                    keys = [
-                        "id",
-                        "createById",
-                        "updateById",
-                        "username",
-                        "joinTime",
-                        "orgName",
-                        "orgId",
-                        "phone",
-                        "name",
-                        "email",
-                        "position",
-                        "sex",
-                        "status",
-                        "createTime",
-                        "updateTime",
-                        "lastLoginTime",
-                    ]
-                    data = get_redis_cli().hmget(f"user:{org_id}_{id}", keys)
-                    if data[0] is None:
-                        return JsonResponse({"code": 401, "msg": "未登录"}, status=401)
-                    user = {}
-                    for i in range(len(keys)):
-                        user[keys[i]] = data[i].decode() if data[i] else None
-                    request.user = user
+                    user_key = f"user:{org_id}_{id}"
+                    user_cache = _get_user_cache()
+                    user = None
+                    if user_cache is not None:
+                        user = user_cache.get((user_key, token))
+                        record_cache("auth_user_l1", user is not None)
+                    if user is None:
+                        with timed("redis_seconds", op="auth_user_hmget"):
+                            data = _fetch_user(user_key, org_id)
+                        if data[0] is None:
+                            return JsonResponse(
+                                {"code": 401, "msg": "未登录"}, status=401
+                            )
+                        user = _build_user(data)
+                        if user_cache is not None:
+                            user_cache.set((user_key, token), user)
+                    # 复制一份，避免视图修改污染缓存
+                    request.user = dict(user)
                     request.token = token
                     pass
 
@@ -63,6 +189,43 @@ def auth_user():
     return decorator
 
 
+def _async_auth_view(view_func):
+    """
+    auth_user 的异步实现，逻辑与同步版本一致
+    """
+
+    @wraps(view_func)
+    async def _wrapped_view(request, *args, **kwargs):
+        token = _get_token(request)
+        if token is None:
+            return JsonResponse({"code": 401, "msg": "未登录"}, status=401)
+        payload = decode_token(token)
+        if payload is None:
+            return JsonResponse({"code": 401, "msg": "未登录"}, status=401)
+
+        user_key = f"user:{payload.get('orgId')}_{payload.get('userId')}"
+        user_cache = _get_user_cache()
+        user = None
+        if user_cache is not None:
+            user = user_cache.get((user_key, token))
+            record_cache("auth_user_l1", user is not None)
+        if user is None:
+            with timed("redis_seconds", op="auth_user_hmget"):
+                data = await get_async_redis_cli().hmget(user_key, USER_KEYS)
+            if data[0] is None:
+                return JsonResponse({"code": 401, "msg": "未登录"}, status=401)
+            user = _build_user(data)
+            if user_cache is not None:
+                user_cache.set((user_key, token), user)
+
+        request.user = dict(user)
+        request.token = token
+        request.cookie_value = token
+        return await view_func(request, *args, **kwargs)
+
+    return _wrapped_view
+
+
 def method_decorator(http_method, url_pattern):
     """
     装饰器，用于装饰视图函数，使其只能处理指定的 http 方法
@@ -74,12 +237,22 @@ def method_decorator(http_method, url_pattern):
 
         view_func.http_methods.append(http_method)
 
-        @wraps(view_func)
-        def _wrapped_view(request, *args, **kwargs):
-            if request.method not in view_func.http_methods:
-                return JsonResponse({"code": 405, "msg": "请求出错"}, status=405)
-                # return HttpResponseNotAllowed(view_func.http_methods)
-            return view_func(request, *args, **kwargs)
+        if asyncio.iscoroutinefunction(view_func):
+
+            @wraps(view_func)
+            async def _wrapped_view(request, *args, **kwargs):
+                if request.method not in view_func.http_methods:
+                    return JsonResponse({"code": 405, "msg": "请求出错"}, status=405)
+                return await view_func(request, *args, **kwargs)
+
+        else:
+
+            @wraps(view_func)
+            def _wrapped_view(request, *args, **kwargs):
+                if request.method not in view_func.http_methods:
+                    return JsonResponse({"code": 405, "msg": "请求出错"}, status=405)
+                    # return HttpResponseNotAllowed(view_func.http_methods)
+                return view_func(request, *args, **kwargs)
 
         _wrapped_view.url_pattern = url_pattern
         _wrapped_view.http_methods = view_func.http_methods
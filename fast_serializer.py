@@ -0,0 +1,240 @@
+import threading
+from typing import Dict, Iterator, List, Optional
+
+from django.db import models
+from rest_framework import serializers
+
+from .base_models import BaseModelSerializer
+from .org import OrgSerializer
+from .utils import format_datetime
+from .log import logger
+
+# BaseModelSerializer.to_representation 中的字段重命名
+_BASE_RENAMES = [
+    ("create_time", "createTime"),
+    ("update_time", "updateTime"),
+    ("org_id", "orgId"),
+    ("is_delete", "isDelete"),
+]
+# 基类中格式化时间的方法字段
+_BASE_METHODS = {
+    "get_create_time": BaseModelSerializer.get_create_time,
+    "get_update_time": BaseModelSerializer.get_update_time,
+}
+# 数据库取值与序列化结果一致，无需格式化的字段组合
+_IDENTITY_FIELDS = (
+    (serializers.IntegerField, (models.IntegerField, models.AutoField)),
+    (serializers.CharField, (models.CharField, models.TextField)),
+)
+
+# 可能按实例数据改变输出的钩子：子类重写时无法编译，回退原序列化
+_INSTANCE_HOOKS = ("to_representation", "get_fields", "__init__")
+# 已确认重写的钩子只做字段重命名、可安全编译的序列化类
+_SAFE_HOOK_CLASSES = {BaseModelSerializer, OrgSerializer}
+
+
+def allow_compiled_serializer(serializer_class):
+    """
+    声明序列化类重写的 to_representation 等钩子与数据无关（只做字段重命名），允许编译
+
+    @allow_compiled_serializer
+    class UserSerializer(BaseModelSerializer):
+        ...
+    """
+    _SAFE_HOOK_CLASSES.add(serializer_class)
+    with _plans_lock:
+        _plans.pop(serializer_class, None)
+    return serializer_class
+
+
+def _overrides_instance_hooks(serializer_class) -> bool:
+    for klass in serializer_class.__mro__:
+        if klass is BaseModelSerializer:
+            return False
+        if klass in _SAFE_HOOK_CLASSES:
+            continue
+        if any(hook in vars(klass) for hook in _INSTANCE_HOOKS):
+            return True
+    return True
+
+
+class SerializerPlan:
+    """
+    序列化计划：一次性解析字段来源、输出字段名及格式化函数
+
+    - columns: values_list 查询的列（attname）
+    - entries: (输出字段名, 列下标, 格式化函数) 元组，按输出顺序排列
+    """
+
+    def __init__(self, columns: List[str], entries: List[tuple]):
+        self.columns = columns
+        self.entries = entries
+        self.verified = False
+
+    def build(self, row) -> dict:
+        return {
+            key: (fmt(row[i]) if fmt is not None and row[i] is not None else row[i])
+            for key, i, fmt in self.entries
+        }
+
+
+# 序列化类 -> 序列化计划，无法编译时为 None
+_plans: Dict[type, Optional[SerializerPlan]] = {}
+_plans_lock = threading.Lock()
+
+
+def _compile(serializer_class) -> Optional[SerializerPlan]:
+    if _overrides_instance_hooks(serializer_class):
+        return None
+    model_class = serializer_class.Meta.model
+    serializer = serializer_class()
+    columns: List[str] = []
+    sources = {}
+
+    def column(attname):
+        if attname not in columns:
+            columns.append(attname)
+        return columns.index(attname)
+
+    readable = {}
+    for field in serializer._readable_fields:
+        name = field.field_name
+        if isinstance(field, serializers.SerializerMethodField):
+            method = getattr(serializer_class, field.method_name, None)
+            if method is not _BASE_METHODS.get(field.method_name):
+                return None
+            readable[name] = (column(name), format_datetime)
+            continue
+
+        if field.source == "*" or len(field.source_attrs) != 1:
+            return None
+        try:
+            model_field = model_class._meta.get_field(field.source)
+        except Exception:
+            return None
+        if model_field.many_to_many or model_field.one_to_many:
+            return None
+
+        if isinstance(field, serializers.RelatedField):
+            if not isinstance(field, serializers.PrimaryKeyRelatedField):
+                return None
+            if field.pk_field is not None:
+                return None
+            readable[name] = (column(model_field.attname), None)
+        else:
+            fmt = field.to_representation
+            for drf_type, model_types in _IDENTITY_FIELDS:
+                if type(field) is drf_type and isinstance(model_field, model_types):
+                    fmt = None
+            readable[name] = (column(model_field.attname), fmt)
+        sources[name] = field.source
+
+    # 模拟 to_representation 中的重命名，保证字段与顺序一致：
+    # 基类的固定重命名，以及子类声明的驼峰字段（source 指向同名下划线字段）
+    renames = list(_BASE_RENAMES)
+    for name, source in sources.items():
+        if source != name and source in readable and (source, name) not in renames:
+            renames.append((source, name))
+    output = dict(readable)
+    for old, new in renames:
+        if old in output:
+            output[new] = output.pop(old)
+
+    entries = [(key, i, fmt) for key, (i, fmt) in output.items()]
+    return SerializerPlan(columns, entries)
+
+
+def compile_serializer(serializer_class) -> Optional[SerializerPlan]:
+    """
+    编译 BaseModelSerializer 子类的序列化计划，结果按类缓存
+
+    存在自定义方法字段、多级 source、多对多等无法编译的字段，
+    或重写了 to_representation 等钩子且未通过 allow_compiled_serializer 声明时返回 None
+    """
+    if serializer_class in _plans:
+        return _plans[serializer_class]
+    with _plans_lock:
+        if serializer_class not in _plans:
+            try:
+                _plans[serializer_class] = _compile(serializer_class)
+            except Exception as e:
+                logger.warning(f"序列化计划编译失败 {serializer_class.__name__}: {str(e)}")
+                _plans[serializer_class] = None
+    return _plans[serializer_class]
+
+
+def _instance(queryset, plan: SerializerPlan, row):
+    """
+    以查询到的列构建模型实例（按模型字段顺序传给 from_db）
+    """
+    values = dict(zip(plan.columns, row))
+    names = [f.attname for f in queryset.model._meta.concrete_fields if f.attname in values]
+    return queryset.model.from_db(queryset.db, names, [values[n] for n in names])
+
+
+def _verify(serializer_class, plan: SerializerPlan, queryset, row) -> bool:
+    """
+    首次使用时以首行数据比对原序列化结果，不一致则该类回退原序列化
+    """
+    try:
+        expected = list(serializer_class(_instance(queryset, plan, row)).data.items())
+        actual = list(plan.build(row).items())
+    except Exception as e:
+        expected, actual = str(e), None
+    if expected != actual:
+        logger.warning(
+            f"序列化计划与原结果不一致，{serializer_class.__name__} 回退原序列化: "
+            f"{expected} != {actual}"
+        )
+        _plans[serializer_class] = None
+        return False
+    plan.verified = True
+    return True
+
+
+def iter_serialized(serializer_class, queryset, chunk_size=2000) -> Iterator[dict]:
+    """
+    逐行序列化查询集，基于 values_list 取值，不实例化模型
+
+    for item in iter_serialized(OrgSerializer, Org.objects.filter(query_data)):
+        ...
+
+    :param serializer_class: BaseModelSerializer 子类，无需改动
+    :param queryset: 已过滤、排序的查询集
+    :param chunk_size: 服务端游标每批读取行数
+    """
+    plan = compile_serializer(serializer_class)
+    if plan is not None and not plan.verified:
+        first = next(iter(queryset.values_list(*plan.columns)[:1]), None)
+        if first is None:
+            return
+        _verify(serializer_class, plan, queryset, first)
+        plan = compile_serializer(serializer_class)
+
+    if plan is None:
+        for instance in queryset.iterator(chunk_size=chunk_size):
+            yield serializer_class(instance).data
+        return
+
+    build = plan.build
+    for row in queryset.values_list(*plan.columns).iterator(chunk_size=chunk_size):
+        yield build(row)
+
+
+def serialize_queryset(serializer_class, queryset) -> List[dict]:
+    """
+    序列化一页数据，结果与 serializer_class(queryset, many=True).data 一致
+
+    data = serialize_queryset(OrgSerializer, Org.objects.filter(query_data)[start:end])
+    """
+    plan = compile_serializer(serializer_class)
+    if plan is None:
+        return serializer_class(queryset, many=True).data
+
+    rows = list(queryset.values_list(*plan.columns))
+    if not rows:
+        return []
+    if not plan.verified and not _verify(serializer_class, plan, queryset, rows[0]):
+        return serializer_class(queryset, many=True).data
+    build = plan.build
+    return [build(row) for row in rows]
@@ -0,0 +1,309 @@
+from typing import Dict, List, Tuple
+
+from django.db import connections, router
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+from django.db.models.signals import post_delete, post_save
+
+from .utils import camel_to_snake
+from .log import logger
+
+
+class KeywordSearchBackend:
+    """
+    关键字搜索后端接口
+    - filter: 生成关键字查询条件
+    - update_index / delete_index: 模型保存、删除后维护索引，数据库自动维护时无需实现
+    - update_index_many: 批量写入后按批刷新索引，默认逐条调用 update_index
+    """
+
+    # 分词后可匹配的最短关键字长度，更短的关键字回退为 icontains
+    min_keyword_length = 1
+
+    def filter(self, model_class, fields: List[str], keywords) -> Q:
+        raise NotImplementedError
+
+    @property
+    def maintains_index(self) -> bool:
+        """
+        是否由 update_index 维护索引，为 False 时批量写入后无需刷新
+        """
+        return type(self).update_index is not KeywordSearchBackend.update_index
+
+    def update_index(self, instance, fields: List[str], using=None):
+        pass
+
+    def update_index_many(self, model_class, fields: List[str], pks=None, using=None) -> int:
+        """
+        刷新指定主键（None 表示全部数据）的索引
+
+        :return: 刷新的数据条数
+        """
+        queryset = model_class._base_manager.using(using)
+        if pks is not None:
+            queryset = queryset.filter(pk__in=pks)
+        count = 0
+        for instance in queryset.iterator():
+            self.update_index(instance, fields, using)
+            count += 1
+        return count
+
+    def delete_index(self, instance, using=None):
+        pass
+
+
+class LikeKeywordBackend(KeywordSearchBackend):
+    """
+    默认实现：各字段 icontains 条件取并集
+    """
+
+    def filter(self, model_class, fields, keywords) -> Q:
+        keyword_condition = Q()
+        for field in fields:
+            keyword_condition |= Q(**{f"{field}__icontains": keywords})
+        return keyword_condition
+
+
+def _columns(model_class, fields, connection):
+    return ", ".join(
+        connection.ops.quote_name(model_class._meta.get_field(f).column) for f in fields
+    )
+
+
+class MySQLFullTextBackend(KeywordSearchBackend):
+    """
+    MySQL FULLTEXT 全文检索，索引由数据库自动维护
+
+    需要在同样的字段组合上建立全文索引，中文内容需使用 ngram 分词：
+    ALTER TABLE t ADD FULLTEXT INDEX ft_t (name, code) WITH PARSER ngram;
+
+    :param ngram_token_size: 与 MySQL 的 ngram_token_size 一致，默认 2
+    """
+
+    def __init__(self, ngram_token_size=2):
+        self.min_keyword_length = ngram_token_size
+
+    def filter(self, model_class, fields, keywords) -> Q:
+        connection = connections[router.db_for_read(model_class)]
+        table = connection.ops.quote_name(model_class._meta.db_table)
+        pk = connection.ops.quote_name(model_class._meta.pk.column)
+        # 整体作为短语匹配，避免关键字中的运算符被解析
+        phrase = '"%s"' % str(keywords).replace('"', " ")
+        return Q(
+            pk__in=RawSQL(
+                f"SELECT {pk} FROM {table} WHERE MATCH({_columns(model_class, fields, connection)}) "
+                "AGAINST (%s IN BOOLEAN MODE)",
+                [phrase],
+            )
+        )
+
+
+class PostgresSearchBackend(KeywordSearchBackend):
+    """
+    PostgreSQL tsvector 全文检索
+
+    模型需包含 SearchVectorField 类型的 vector_field 字段并建立 GIN 索引，
+    保存后由 update_index 刷新该字段
+    """
+
+    def __init__(self, vector_field="search_vector", config=None):
+        self.vector_field = vector_field
+        self.config = config
+
+    def filter(self, model_class, fields, keywords) -> Q:
+        from django.contrib.postgres.search import SearchQuery
+
+        return Q(**{self.vector_field: SearchQuery(keywords, config=self.config)})
+
+    def update_index(self, instance, fields, using=None):
+        from django.contrib.postgres.search import SearchVector
+
+        type(instance)._base_manager.using(using).filter(pk=instance.pk).update(
+            **{self.vector_field: SearchVector(*fields, config=self.config)}
+        )
+
+    def update_index_many(self, model_class, fields, pks=None, using=None) -> int:
+        from django.contrib.postgres.search import SearchVector
+
+        queryset = model_class._base_manager.using(using)
+        if pks is not None:
+            queryset = queryset.filter(pk__in=pks)
+        return queryset.update(
+            **{self.vector_field: SearchVector(*fields, config=self.config)}
+        )
+
+
+class SqliteFTS5Backend(KeywordSearchBackend):
+    """
+    SQLite FTS5 全文检索（用于测试环境），使用 trigram 分词支持子串匹配
+
+    索引表为 {表名}_fts，rowid 与主键一致，首次注册时自动创建
+    """
+
+    # trigram 分词，少于 3 个字符的关键字无法匹配
+    min_keyword_length = 3
+
+    def _table(self, model_class):
+        return f"{model_class._meta.db_table}_fts"
+
+    def ensure_index(self, model_class, fields, using=None):
+        connection = connections[using or router.db_for_write(model_class)]
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"CREATE VIRTUAL TABLE IF NOT EXISTS {self._table(model_class)} "
+                f"USING fts5({_columns(model_class, fields, connection)}, tokenize='trigram')"
+            )
+
+    def filter(self, model_class, fields, keywords) -> Q:
+        fts = self._table(model_class)
+        phrase = '"%s"' % str(keywords).replace('"', '""')
+        return Q(pk__in=RawSQL(f"SELECT rowid FROM {fts} WHERE {fts} MATCH %s", [phrase]))
+
+    def update_index(self, instance, fields, using=None):
+        model_class = type(instance)
+        connection = connections[using or router.db_for_write(model_class)]
+        values = [getattr(instance, f) or "" for f in fields]
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"INSERT OR REPLACE INTO {self._table(model_class)} "
+                f"(rowid, {_columns(model_class, fields, connection)}) "
+                f"VALUES (%s, {', '.join(['%s'] * len(fields))})",
+                [instance.pk, *values],
+            )
+
+    def update_index_many(self, model_class, fields, pks=None, using=None) -> int:
+        connection = connections[using or router.db_for_write(model_class)]
+        qn = connection.ops.quote_name
+        values = ", ".join(
+            f"COALESCE({qn(model_class._meta.get_field(f).column)}, '')" for f in fields
+        )
+        pk = qn(model_class._meta.pk.column)
+        sql = (
+            f"INSERT OR REPLACE INTO {self._table(model_class)} "
+            f"(rowid, {_columns(model_class, fields, connection)}) "
+            f"SELECT {pk}, {values} FROM {qn(model_class._meta.db_table)}"
+        )
+        params = []
+        if pks is not None:
+            pks = list(pks)
+            if not pks:
+                return 0
+            sql += f" WHERE {pk} IN ({', '.join(['%s'] * len(pks))})"
+            params = pks
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            return cursor.rowcount
+
+    def delete_index(self, instance, using=None):
+        model_class = type(instance)
+        connection = connections[using or router.db_for_write(model_class)]
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"DELETE FROM {self._table(model_class)} WHERE rowid = %s", [instance.pk]
+            )
+
+
+# 已注册的模型：模型类 -> (搜索后端, 字段列表)
+_registry: Dict[type, Tuple[KeywordSearchBackend, List[str]]] = {}
+
+
+def get_default_backend(model_class) -> KeywordSearchBackend:
+    """
+    按模型所在数据库类型选择搜索后端
+    """
+    vendor = connections[router.db_for_write(model_class)].vendor
+    if vendor == "mysql":
+        return MySQLFullTextBackend()
+    if vendor == "postgresql":
+        return PostgresSearchBackend()
+    if vendor == "sqlite":
+        return SqliteFTS5Backend()
+    return LikeKeywordBackend()
+
+
+def register_keyword_search(model_class, fields, backend: KeywordSearchBackend = None):
+    """
+    为模型注册全文检索，并在模型保存、删除后维护索引
+
+    register_keyword_search(Org, ["name", "code"])
+
+    :param model_class: BaseModel 子类
+    :param fields: 参与检索的字段，需与 getBaseParams 的 keyword_fields 一致
+    :param backend: 搜索后端，默认按数据库类型选择
+    """
+    backend = backend or get_default_backend(model_class)
+    fields = [camel_to_snake(f) for f in fields]
+    if isinstance(backend, SqliteFTS5Backend):
+        backend.ensure_index(model_class, fields)
+    _registry[model_class] = (backend, fields)
+
+    uid = f"keyword_search:{model_class._meta.label}"
+    post_save.connect(_update_keyword_index, sender=model_class, dispatch_uid=uid)
+    post_delete.connect(_delete_keyword_index, sender=model_class, dispatch_uid=uid)
+
+
+def _update_keyword_index(sender, instance, raw=False, using=None, **kwargs):
+    if raw or (entry := _registry.get(sender)) is None:
+        return
+    backend, fields = entry
+    backend.update_index(instance, fields, using)
+
+
+def _delete_keyword_index(sender, instance, using=None, **kwargs):
+    if (entry := _registry.get(sender)) is None:
+        return
+    backend, _ = entry
+    backend.delete_index(instance, using)
+
+
+def rebuild_keyword_index(model_class, batch_size=1000, using=None):
+    """
+    重建模型全部数据的检索索引，用于注册后回填或批量写入后修复
+
+    索引由数据库自动维护（如 MySQL FULLTEXT）时不做处理
+    """
+    backend, fields = _registry[model_class]
+    if not backend.maintains_index:
+        return 0
+    count = backend.update_index_many(model_class, fields, using=using)
+    logger.info(f"检索索引重建完成: {model_class._meta.label} {count} 条")
+    return count
+
+
+def refresh_keyword_index(model_class, pks, using=None, batch_size=1000) -> int:
+    """
+    批量写入（不触发信号）后按批刷新指定数据的检索索引，
+    模型未注册或索引由数据库自动维护时不做处理
+
+    :param pks: 写入数据的主键，为 None 或含 None（如 bulk_create 不回填主键）时重建全部索引
+    :return: 刷新的数据条数
+    """
+    if (entry := _registry.get(model_class)) is None:
+        return 0
+    backend, fields = entry
+    if not backend.maintains_index:
+        return 0
+    if pks is None or None in pks:
+        return rebuild_keyword_index(model_class, batch_size, using)
+    pks = list(pks)
+    count = 0
+    for start in range(0, len(pks), batch_size):
+        count += backend.update_index_many(
+            model_class, fields, pks[start : start + batch_size], using
+        )
+    return count
+
+
+def get_keyword_filter(model_class, keyword_fields, keywords) -> Q:
+    """
+    生成关键字查询条件
+
+    模型已注册、字段与注册时一致且关键字不短于分词长度时使用全文检索后端，否则使用 icontains
+    """
+    fields = [camel_to_snake(f) for f in keyword_fields]
+    entry = _registry.get(model_class) if model_class is not None else None
+    if entry is not None and set(entry[1]) == set(fields):
+        backend, registered_fields = entry
+        if len(str(keywords)) >= backend.min_keyword_length:
+            return backend.filter(model_class, registered_fields, keywords)
+    return LikeKeywordBackend().filter(model_class, fields, keywords)
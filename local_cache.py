@@ -0,0 +1,80 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+class LocalCache:
+    """
+    进程内 LRU + TTL 缓存（线程安全）
+
+    cache = LocalCache(max_size=1000, ttl=30)
+    cache.set("key", "value")
+    cache.get("key")  # 输出：value
+    """
+
+    def __init__(self, max_size=10000, ttl=30):
+        """
+        :param max_size: 最大条目数，超出后淘汰最久未使用的条目
+        :param ttl: 默认有效期(秒)
+        """
+        self.max_size = max_size
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._data)
+
+    def get(self, key, default=None):
+        now = time.monotonic()
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                self.misses += 1
+                return default
+            expires_at, value = item
+            if expires_at <= now:
+                del self._data[key]
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value, ttl=None):
+        """
+        :param ttl: 本条目有效期(秒)，为空时使用默认有效期，小于等于 0 时不缓存
+        """
+        ttl = self.ttl if ttl is None else ttl
+        if ttl <= 0:
+            return
+        expires_at = time.monotonic() + ttl
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def delete_where(self, predicate):
+        """
+        删除所有 key 满足 predicate 的条目
+        """
+        with self._lock:
+            for key in [k for k in self._data if predicate(k)]:
+                del self._data[key]
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self):
+        """
+        缓存统计：条目数、命中次数、未命中次数
+        """
+        return {"size": len(self._data), "hits": self.hits, "misses": self.misses}
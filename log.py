@@ -1,4 +1,11 @@
+import atexit
+import copy
 import logging
+import os
+import queue
+import reprlib
+import threading
+from logging.handlers import QueueHandler, QueueListener
 
 
 def _get_logger():
@@ -9,3 +16,175 @@ def _get_logger():
 
 # 日志句柄
 logger = _get_logger()
+
+class _PayloadRepr(reprlib.Repr):
+    """
+    按类型名分派，Q 按子条件逐个渲染，查询集只输出模型名，均不调用完整的 repr()
+    """
+
+    def repr_Q(self, x, level):
+        if level <= 0:
+            return "(...)"
+        children = [
+            # (查询条件, 值) 不单独占用一层，避免嵌套条件过早被省略
+            f"({child[0]!r}, {self.repr1(child[1], level - 1)})"
+            if isinstance(child, tuple) and len(child) == 2
+            else self.repr1(child, level - 1)
+            for child in x.children[: self.maxlist]
+        ]
+        if len(x.children) > self.maxlist:
+            children.append("...")
+        text = f"({x.connector}: {', '.join(children)})"
+        return f"(NOT {text})" if x.negated else text
+
+    def repr_QuerySet(self, x, level):
+        # repr(QuerySet) 会执行查询
+        return f"<QuerySet {x.model.__name__}>"
+
+
+# 日志中大对象（请求体、响应内容等）的渲染上限
+_payload_repr = _PayloadRepr()
+_payload_repr.maxlevel = 3
+_payload_repr.maxdict = 20
+_payload_repr.maxlist = 20
+_payload_repr.maxset = 20
+_payload_repr.maxtuple = 20
+_payload_repr.maxstring = 200
+_payload_repr.maxother = 200
+PAYLOAD_MAX_LENGTH = 2000
+
+
+class payload:
+    """
+    延迟渲染且限制长度的日志参数，日志级别未开启时不做任何格式化
+
+    logger.info("获取到的参数: %s", payload(body))
+    """
+
+    __slots__ = ("obj", "limit")
+
+    def __init__(self, obj, limit=PAYLOAD_MAX_LENGTH):
+        self.obj = obj
+        self.limit = limit
+
+    def __str__(self):
+        text = _payload_repr.repr(self.obj)
+        if len(text) > self.limit:
+            return f"{text[: self.limit]}...(已截断)"
+        return text
+
+    __repr__ = __str__
+
+
+class CallSiteSampler(logging.Filter):
+    """
+    按调用位置采样：同一调用位置每 every 条只保留 1 条，level 及以上级别不采样
+
+    :param every: 默认采样间隔
+    :param level: 不采样的最低级别，默认 WARNING
+    :param overrides: 指定调用位置的采样间隔，如 {"base_query.py:808": 100}
+    """
+
+    def __init__(self, every=1, level=logging.WARNING, overrides=None):
+        super().__init__()
+        self.every = every
+        self.level = level
+        self.overrides = overrides or {}
+        self._counts = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record):
+        if record.levelno >= self.level:
+            return True
+        key = (record.pathname, record.lineno)
+        every = self.overrides.get(
+            f"{os.path.basename(record.pathname)}:{record.lineno}", self.every
+        )
+        if every <= 1:
+            return True
+        with self._lock:
+            count = self._counts.get(key, 0)
+            self._counts[key] = count + 1
+        return count % every == 0
+
+
+# 可安全交给后台线程格式化的日志参数类型
+_SCALARS = (str, int, float, bool, bytes, type(None))
+
+
+class _DroppingQueueHandler(QueueHandler):
+    """
+    队列已满时丢弃日志，不阻塞请求线程
+
+    参数均为不可变标量时入队原始日志记录，由后台线程格式化；
+    含 payload、请求体等对象时在当前线程渲染为字符串，不把仍会被修改的对象交给后台线程
+    """
+
+    dropped = 0
+
+    def prepare(self, record):
+        args = record.args
+        if not args or (
+            isinstance(args, tuple) and all(isinstance(a, _SCALARS) for a in args)
+        ):
+            return record
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+_listener = None
+
+
+def setup_queue_logging(handlers=None, queue_size=10000, sampler=None):
+    """
+    将 log 日志句柄改为队列异步输出：请求线程只负责入队，由后台线程写日志
+
+    :param handlers: 实际输出日志的 handler，默认沿用 log / root 日志句柄上已配置的 handler
+    :param queue_size: 队列长度上限，队列满时丢弃日志
+    :param sampler: 调用位置采样过滤器，如 CallSiteSampler(every=10)
+    :return: QueueListener
+    """
+    global _listener
+
+    if _listener is not None:
+        return _listener
+
+    if handlers is None:
+        handlers = (
+            logger.handlers[:]
+            or logging.getLogger().handlers[:]
+            or [logging.StreamHandler()]
+        )
+    for handler in logger.handlers[:]:
+        logger.removeHandler(handler)
+
+    log_queue = queue.Queue(queue_size)
+    logger.addHandler(_DroppingQueueHandler(log_queue))
+    # 已由队列输出，不再向 root 传递，避免同步重复输出
+    logger.propagate = False
+    if sampler is not None:
+        logger.addFilter(sampler)
+
+    _listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _listener.start()
+    atexit.register(stop_queue_logging)
+    return _listener
+
+
+def stop_queue_logging():
+    """
+    停止后台日志线程，并输出队列中剩余的日志
+    """
+    global _listener
+
+    if _listener is not None:
+        listener, _listener = _listener, None
+        listener.stop()
@@ -0,0 +1,146 @@
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+
+class MetricsSink:
+    """
+    指标输出接口：计数器与耗时分布
+
+    标签应为低基数取值（如缓存名、命中结果、删除方式），不要使用用户ID、机构ID等
+    """
+
+    def incr(self, name, value=1, **labels):
+        pass
+
+    def observe(self, name, value, **labels):
+        pass
+
+
+class NullSink(MetricsSink):
+    """
+    默认实现：不记录任何指标
+    """
+
+
+class InMemorySink(MetricsSink):
+    """
+    内存实现，用于测试断言
+
+    sink = InMemorySink()
+    set_metrics_sink(sink)
+    sink.counter("cache_requests_total", cache="jwt", result="hit")  # 输出：命中次数
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counters = defaultdict(float)
+        self.observations = defaultdict(list)
+
+    @staticmethod
+    def _key(name, labels):
+        return (name, tuple(sorted(labels.items())))
+
+    def incr(self, name, value=1, **labels):
+        with self._lock:
+            self.counters[self._key(name, labels)] += value
+
+    def observe(self, name, value, **labels):
+        with self._lock:
+            self.observations[self._key(name, labels)].append(value)
+
+    def counter(self, name, **labels):
+        return self.counters.get(self._key(name, labels), 0)
+
+    def values(self, name, **labels):
+        return list(self.observations.get(self._key(name, labels), []))
+
+    def clear(self):
+        with self._lock:
+            self.counters.clear()
+            self.observations.clear()
+
+
+class PrometheusSink(MetricsSink):
+    """
+    Prometheus 实现，需要安装 prometheus_client
+
+    set_metrics_sink(PrometheusSink(namespace="python_utils"))
+    """
+
+    def __init__(self, namespace="", registry=None):
+        import prometheus_client
+
+        self._client = prometheus_client
+        self._namespace = namespace
+        self._registry = registry or prometheus_client.REGISTRY
+        self._lock = threading.Lock()
+        self._metrics = {}
+
+    def _metric(self, kind, name, labels):
+        metric = self._metrics.get(name)
+        if metric is None:
+            with self._lock:
+                metric = self._metrics.get(name)
+                if metric is None:
+                    metric = kind(
+                        name,
+                        name,
+                        sorted(labels),
+                        namespace=self._namespace,
+                        registry=self._registry,
+                    )
+                    self._metrics[name] = metric
+        return metric.labels(**labels) if labels else metric
+
+    def incr(self, name, value=1, **labels):
+        self._metric(self._client.Counter, name, labels).inc(value)
+
+    def observe(self, name, value, **labels):
+        self._metric(self._client.Histogram, name, labels).observe(value)
+
+
+_sink: MetricsSink = NullSink()
+
+
+def set_metrics_sink(sink: MetricsSink):
+    """
+    设置全局指标输出
+    """
+    global _sink
+    _sink = sink
+
+
+def get_metrics_sink() -> MetricsSink:
+    return _sink
+
+
+def incr(name, value=1, **labels):
+    _sink.incr(name, value, **labels)
+
+
+def observe(name, value, **labels):
+    _sink.observe(name, value, **labels)
+
+
+def record_cache(cache, hit):
+    """
+    记录缓存命中情况：cache_requests_total{cache, result}
+    """
+    _sink.incr("cache_requests_total", cache=cache, result="hit" if hit else "miss")
+
+
+@contextmanager
+def timed(name, **labels):
+    """
+    记录代码块耗时(秒)
+
+    with timed("org_sql_seconds", kind="subtree"):
+        ...
+    """
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        _sink.observe(name, time.perf_counter() - started, **labels)
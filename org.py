@@ -10,8 +10,12 @@ class Org(BaseModel):
     controller_name = models.CharField(verbose_name="负责人姓名", max_length=255)
     controller_tel = models.CharField(verbose_name="负责人联系电话", max_length=255)
     org_name = models.CharField(verbose_name="所属机构名称", max_length=255)
+    # 物化路径 /根机构id/.../自身id/，由 org_path 在保存时维护
+    path = models.CharField(
+        verbose_name="层级路径", max_length=768, blank=True, default="", db_index=True
+    )
 
-    class Meta:
+    class Meta(BaseModel.Meta):
         db_table = "sys_org"  # 数据库表名
         verbose_name = "企业/机构"
         app_label = "*"
@@ -26,7 +30,7 @@ class OrgSerializer(BaseModelSerializer):
 
     class Meta:
         model = Org
-        fields = "__all__"
+        exclude = ["path"]
 
     def to_representation(self, instance):
         representation = super().to_representation(instance)
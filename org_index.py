@@ -0,0 +1,308 @@
+import threading
+import time
+from array import array
+from typing import Dict, FrozenSet, List, Optional
+
+from redis import RedisError
+
+from .db_router import get_read_db
+from .org import Org
+from .utils import get_async_redis_cli, get_redis_cli, get_setting
+from .log import logger
+
+
+class OrgHierarchyIndex:
+    """
+    机构层级内存索引
+
+    基于一次 sys_org 全表扫描构建 parent/children 数组及欧拉序编号：
+    - 后代集合: 欧拉序数组中 [tin, tout) 区间即为整棵子树
+    - 层级判断: tin[y] <= tin[x] < tout[y] 即 x 位于 y 之下，O(1)
+    - 祖先链: 沿 parent 数组上溯，O(depth)
+    """
+
+    # 子树结果缓存中机构ID的总数上限，超出后整体清空；按ID总数而非子树个数限制，
+    # 避免大量接近根节点的大子树占满内存
+    MEMO_MAX_IDS = 262144
+
+    def __init__(self, rows):
+        """
+        :param rows: 可迭代的 (id, 上级机构id, is_delete) 三元组
+        """
+        rows = list(rows)
+        count = len(rows)
+
+        self._pos: Dict[int, int] = {}
+        self._ids = array("q", [0]) * count
+        self._parent = array("q", [-1]) * count
+        self._live = bytearray(count)
+        for i, (org_id, parent_id, is_delete) in enumerate(rows):
+            self._pos[org_id] = i
+            self._ids[i] = org_id
+            self._live[i] = 0 if is_delete == 1 else 1
+
+        # ========================== 1. parent / children 数组 ==========================
+        child_count = array("q", [0]) * (count + 1)
+        for i, (org_id, parent_id, _) in enumerate(rows):
+            p = self._pos.get(parent_id, -1) if parent_id is not None else -1
+            if p == i:
+                p = -1
+            self._parent[i] = p
+            if p >= 0:
+                child_count[p + 1] += 1
+
+        # CSR 形式存储子节点：children[start[i]:start[i + 1]]
+        self._child_start = child_count
+        for i in range(count):
+            self._child_start[i + 1] += self._child_start[i]
+        self._children = array("q", [0]) * count
+        cursor = array("q", self._child_start[:count])
+        for i in range(count):
+            p = self._parent[i]
+            if p >= 0:
+                self._children[cursor[p]] = i
+                cursor[p] += 1
+
+        # ========================== 2. 欧拉序编号 ==========================
+        self._tin = array("q", [-1]) * count
+        self._tout = array("q", [-1]) * count
+        self._order = array("q", [0]) * count
+        timer = 0
+        roots = [i for i in range(count) if self._parent[i] < 0]
+        # 环上的节点无法从根到达，上溯到环内节点后断开，作为根处理
+        for start in roots + list(range(count)):
+            if self._tin[start] >= 0:
+                continue
+            if self._parent[start] >= 0:
+                seen = set()
+                while start not in seen:
+                    seen.add(start)
+                    start = self._parent[start]
+                logger.warning(f"检测到机构循环引用: {self._ids[start]}")
+                self._parent[start] = -1
+            stack = [(start, self._child_start[start])]
+            self._tin[start] = timer
+            self._order[timer] = start
+            timer += 1
+            while stack:
+                node, next_child = stack[-1]
+                if next_child < self._child_start[node + 1]:
+                    stack[-1] = (node, next_child + 1)
+                    child = self._children[next_child]
+                    if self._tin[child] >= 0:
+                        continue
+                    self._tin[child] = timer
+                    self._order[timer] = child
+                    timer += 1
+                    stack.append((child, self._child_start[child]))
+                else:
+                    self._tout[node] = timer
+                    stack.pop()
+
+        self._memo: Dict[int, FrozenSet[int]] = {}
+        self._memo_ids = 0
+
+    def __len__(self):
+        return len(self._pos)
+
+    def __contains__(self, org_id):
+        return self._node(org_id) >= 0
+
+    def _node(self, org_id) -> int:
+        try:
+            return self._pos.get(int(org_id), -1)
+        except (TypeError, ValueError):
+            return -1
+
+    def descendants(self, org_id) -> FrozenSet[int]:
+        """
+        获取机构及其所有子机构ID（含已删除节点，与递归查询口径一致）
+        """
+        node = self._node(org_id)
+        if node < 0:
+            return frozenset()
+        if (cached := self._memo.get(node)) is not None:
+            return cached
+        order = self._order[self._tin[node] : self._tout[node]]
+        result = frozenset(self._ids[i] for i in order)
+        if len(result) > self.MEMO_MAX_IDS:
+            return result
+        if self._memo_ids + len(result) > self.MEMO_MAX_IDS:
+            self._memo.clear()
+            self._memo_ids = 0
+        self._memo[node] = result
+        self._memo_ids += len(result)
+        return result
+
+    def ancestors(self, org_id, include_deleted=False) -> List[int]:
+        """
+        获取机构及所有父机构ID，自身在前、根机构在后
+
+        :param include_deleted: 为 False 时遇到已删除机构即停止，与递归查询口径一致
+        """
+        node = self._node(org_id)
+        chain = []
+        while node >= 0:
+            if not include_deleted and not self._live[node]:
+                break
+            chain.append(self._ids[node])
+            node = self._parent[node]
+        return chain
+
+    def is_under(self, org_id, ancestor_id) -> bool:
+        """
+        判断 org_id 是否位于 ancestor_id 之下（自身视为位于自身之下）
+        """
+        x = self._node(org_id)
+        y = self._node(ancestor_id)
+        if x < 0 or y < 0:
+            return False
+        return self._tin[y] <= self._tin[x] < self._tout[y]
+
+
+_org_index: Optional[OrgHierarchyIndex] = None
+_org_index_built_at = 0.0
+_org_index_lock = threading.Lock()
+# 构建索引时读取到的全局版本号及最近一次检查时间
+_org_index_version = None
+_org_index_checked_at = 0.0
+
+# 机构层级全局版本号，任一 worker 失效索引时递增，其他 worker 据此重建
+ORG_INDEX_VERSION_KEY = "org_index:version"
+_UNKNOWN = object()
+
+
+def _read_index_version():
+    """
+    读取全局版本号，Redis 不可用时返回 _UNKNOWN，此时索引按 MAX_AGE 过期
+    """
+    try:
+        return get_redis_cli().get(ORG_INDEX_VERSION_KEY)
+    except RedisError as e:
+        logger.warning(f"机构层级索引版本号读取失败: {str(e)}")
+        return _UNKNOWN
+
+
+async def _aread_index_version():
+    try:
+        return await get_async_redis_cli().get(ORG_INDEX_VERSION_KEY)
+    except RedisError as e:
+        logger.warning(f"机构层级索引版本号读取失败: {str(e)}")
+        return _UNKNOWN
+
+
+def _fresh_index(index):
+    """
+    返回未过期的索引（过期时为 None）及是否到了检查全局版本号的时间
+    """
+    global _org_index_checked_at
+
+    now = time.monotonic()
+    max_age = get_setting("ORG_INDEX", "MAX_AGE", 300)
+    if index is None or now - _org_index_built_at >= max_age:
+        return None, False
+    if now - _org_index_checked_at < get_setting("ORG_INDEX", "CHECK_INTERVAL", 1):
+        return index, False
+    _org_index_checked_at = now
+    return index, True
+
+
+def _check_index_version(index, version):
+    """
+    全局版本号与构建时不一致时标记索引过期并返回 None
+    """
+    if version is _UNKNOWN or version == _org_index_version:
+        return index
+    _expire_org_index()
+    return None
+
+
+def build_org_index() -> OrgHierarchyIndex:
+    """
+    全表扫描 sys_org 重建机构层级索引并替换当前索引
+    """
+    global _org_index, _org_index_built_at, _org_index_version, _org_index_checked_at
+
+    started = time.monotonic()
+    # 先读版本号再扫描：扫描期间发生的变更会使版本号不一致，下次检查时再次重建
+    version = _read_index_version()
+    rows = (
+        Org.all_objects.using(get_read_db(Org))
+        .values_list("id", "org_id", "is_delete")
+        .order_by()
+    )
+    index = OrgHierarchyIndex(rows.iterator())
+    _org_index = index
+    _org_index_version = None if version is _UNKNOWN else version
+    _org_index_built_at = _org_index_checked_at = time.monotonic()
+    logger.info(
+        f"机构层级索引重建完成: {len(index)} 个节点, "
+        f"耗时 {(_org_index_built_at - started) * 1000:.1f}ms"
+    )
+    return index
+
+
+def get_org_index(build=True) -> Optional[OrgHierarchyIndex]:
+    """
+    获取进程内机构层级索引，未启用时返回 None
+
+    配置项 settings.ORG_INDEX:
+    - ENABLED: 是否启用，默认 False
+    - MAX_AGE: 索引最长使用时间(秒)，超时后重建，默认 300
+    - CHECK_INTERVAL: 检查全局版本号的间隔(秒)，其他 worker 修改机构后最迟在该间隔内重建，默认 1
+
+    :param build: 索引不存在或已过期时是否重建；异步上下文中使用 aget_org_index
+    """
+    if not get_setting("ORG_INDEX", "ENABLED", False):
+        return None
+
+    current = _org_index
+    index, check = _fresh_index(current)
+    if check:
+        index = _check_index_version(index, _read_index_version())
+    if index is not None:
+        return index
+    if not build:
+        return None
+
+    # 已有旧索引时由单个线程重建，其余线程继续使用旧索引
+    if not _org_index_lock.acquire(blocking=current is None):
+        return current
+    try:
+        if _org_index is not current:
+            return _org_index
+        return build_org_index()
+    finally:
+        _org_index_lock.release()
+
+
+async def aget_org_index() -> Optional[OrgHierarchyIndex]:
+    """
+    get_org_index(build=False) 的异步版本：通过异步客户端检查全局版本号，不阻塞事件循环，
+    索引不存在或已过期时返回 None（不查询数据库，由同步请求重建）
+    """
+    if not get_setting("ORG_INDEX", "ENABLED", False):
+        return None
+
+    index, check = _fresh_index(_org_index)
+    if check:
+        index = _check_index_version(index, await _aread_index_version())
+    return index
+
+
+def _expire_org_index():
+    global _org_index_built_at
+    _org_index_built_at = float("-inf")
+
+
+def invalidate_org_index():
+    """
+    标记机构层级索引过期，并递增全局版本号通知其他 worker，下次访问时重建
+    """
+    _expire_org_index()
+    if not get_setting("ORG_INDEX", "ENABLED", False):
+        return
+    try:
+        get_redis_cli().incr(ORG_INDEX_VERSION_KEY)
+    except RedisError as e:
+        logger.warning(f"机构层级索引版本号递增失败: {str(e)}")
@@ -0,0 +1,147 @@
+from typing import Optional
+
+from django.db import transaction
+from django.db.models import Q, Value
+from django.db.models.functions import Concat, Substr
+from django.db.models.signals import post_save, pre_save
+from django.dispatch import receiver
+
+from .org import Org
+from .org_index import OrgHierarchyIndex
+from .log import logger
+
+
+def _build_path(parent_path: Optional[str], org_id) -> str:
+    """
+    物化路径格式为 /根机构id/.../自身id/，上级机构路径未知时为空字符串
+    """
+    if parent_path is None:
+        return f"/{org_id}/"
+    if not parent_path:
+        return ""
+    return f"{parent_path}{org_id}/"
+
+
+def get_org_path(org_id, using=None) -> Optional[str]:
+    """
+    获取机构的物化路径，机构不存在返回 None，未回填返回空字符串
+    """
+    return (
+        Org.all_objects.using(using)
+        .filter(pk=org_id)
+        .values_list("path", flat=True)
+        .first()
+    )
+
+
+def get_org_path_filter(org_id, field="org_id", using=None) -> Optional[Q]:
+    """
+    按物化路径生成机构范围条件：field IN (SELECT id FROM sys_org WHERE path LIKE '/1/5/%')
+
+    路径前缀为常量，数据库可走 path 索引范围扫描，无需在 Python 中展开子机构ID列表
+    机构不存在或路径未回填时返回 None，由调用方回退为 IN 列表
+
+    :param org_id: 用户所在机构
+    :param field: 数据所属机构字段
+    """
+    path = get_org_path(org_id, using)
+    if not path:
+        return None
+    subtree = Org.all_objects.using(using).filter(path__startswith=path).values("id")
+    return Q(**{f"{field}__in": subtree})
+
+
+def rebuild_org_paths(using=None, batch_size=1000, org_ids=None) -> int:
+    """
+    按机构层级重建物化路径，用于首次回填或批量写入机构后修复
+
+    :param org_ids: 只重建这些机构及其子树的路径，默认重建全部；
+                    层级关系仍需扫描全表的 id 与上级机构，只读取并更新子树内的路径
+    :return: 路径发生变化的机构数量
+    """
+    manager = Org.all_objects.using(using)
+    index = OrgHierarchyIndex(
+        manager.values_list("id", "org_id", "is_delete").order_by().iterator()
+    )
+    rows = manager.values_list("id", "path").order_by()
+    if org_ids is None:
+        batches = [rows.iterator()]
+    else:
+        subtree = sorted(set().union(*(index.descendants(i) for i in org_ids)))
+        batches = (
+            rows.filter(pk__in=subtree[start : start + batch_size])
+            for start in range(0, len(subtree), batch_size)
+        )
+    changed = []
+    for batch in batches:
+        for org_id, path in batch:
+            chain = index.ancestors(org_id, include_deleted=True)
+            new_path = "/" + "/".join(str(i) for i in reversed(chain)) + "/"
+            if new_path != path:
+                changed.append(Org(id=org_id, path=new_path))
+    if changed:
+        with transaction.atomic(using=using):
+            manager.bulk_update(changed, ["path"], batch_size=batch_size)
+    logger.info("重建机构物化路径: %s条", len(changed))
+    return len(changed)
+
+
+@receiver(pre_save, sender=Org)
+def _remember_org_prev(sender, instance, raw=False, using=None, **kwargs):
+    """
+    记录机构保存前的 (上级机构, 删除状态, 路径)，供物化路径与机构缓存判断层级是否变化
+
+    path 只由本模块维护：保存时以数据库中的当前值覆盖实例上的值，
+    避免加载后其他请求移动了上级机构，旧实例保存时把过期路径写回数据库
+    """
+    if raw:
+        return
+    prev = None
+    if instance.pk is not None:
+        prev = (
+            Org.all_objects.using(using)
+            .filter(pk=instance.pk)
+            .values_list("org_id", "is_delete", "path")
+            .first()
+        )
+    instance._org_prev = prev
+    instance.path = prev[2] if prev else ""
+
+
+@receiver(post_save, sender=Org)
+def _update_org_path_on_save(sender, instance, created, raw=False, using=None, **kwargs):
+    """
+    机构新增或移动时更新自身及子树的物化路径
+    """
+    if raw:
+        return
+    prev = getattr(instance, "_org_prev", None)
+    old_path = prev[2] if prev else ""
+    if prev and prev[0] == instance.org_id and old_path:
+        # 上级机构未变化
+        return
+
+    manager = Org.all_objects.using(using)
+    # 上级机构不存在时视为根机构
+    parent_path = get_org_path(instance.org_id, using) if instance.org_id else None
+    new_path = _build_path(parent_path, instance.pk)
+    if len(new_path) > Org._meta.get_field("path").max_length:
+        logger.warning(f"机构{instance.pk}层级过深，物化路径已置空")
+        new_path = ""
+    if old_path and new_path.startswith(old_path) and new_path != old_path:
+        # 移动到自身子树下形成循环，路径置空，范围查询回退为 IN 列表
+        logger.warning(f"检测到机构循环引用: {instance.pk}")
+        new_path = ""
+    if new_path == old_path:
+        return
+
+    manager.filter(pk=instance.pk).update(path=new_path)
+    instance.path = new_path
+    if old_path:
+        descendants = manager.filter(path__startswith=old_path).exclude(pk=instance.pk)
+        if new_path:
+            descendants.update(
+                path=Concat(Value(new_path), Substr("path", len(old_path) + 1))
+            )
+        else:
+            descendants.update(path="")
@@ -0,0 +1,93 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Optional
+
+from .utils import _request_redis_clis, get_redis_cli
+
+_current: ContextVar[Optional["RequestRedis"]] = ContextVar("request_redis", default=None)
+
+_MISSING = object()
+
+
+class RequestRedis:
+    """
+    请求级 Redis 上下文
+    1. 请求内复用同一个客户端，不再每次经过 caches[alias] 查找
+    2. 将互不依赖的读取合并为一次管道往返，结果留待后续读取时直接使用
+    """
+
+    def __init__(self):
+        self._prefetched = {}
+
+    def prefetch(self, commands) -> list:
+        """
+        一次管道执行多个读取命令，出错的命令结果为异常对象
+
+        ctx.prefetch([("hmget", user_key, USER_KEYS), ("get", org_set_key(org_id))])
+
+        :param commands: (命令, 键, *参数) 列表
+        :return: 各命令结果
+        """
+        pipe = get_redis_cli().pipeline(transaction=False)
+        for name, key, *args in commands:
+            getattr(pipe, name)(key, *args)
+        results = pipe.execute(raise_on_error=False)
+        for (name, key, *_), result in zip(commands, results):
+            self._prefetched[(name, key)] = result
+        return results
+
+    def take(self, name, key, default=_MISSING):
+        """
+        取出预读结果，每个结果只使用一次，之后的读取仍访问 Redis
+        """
+        return self._prefetched.pop((name, key), default)
+
+
+def get_request_redis() -> Optional[RequestRedis]:
+    """
+    获取当前请求的 Redis 上下文，不在请求上下文中时返回 None
+    """
+    return _current.get()
+
+
+def take_prefetched(name, key, default=_MISSING):
+    """
+    取出当前请求中的预读结果，没有时返回 default
+    """
+    ctx = _current.get()
+    if ctx is None:
+        return default
+    return ctx.take(name, key, default)
+
+
+@contextmanager
+def request_redis():
+    """
+    进入请求级 Redis 上下文，用于任务、脚本等非 HTTP 请求场景
+
+    with request_redis():
+        ...
+    """
+    ctx = RequestRedis()
+    token = _current.set(ctx)
+    clis_token = _request_redis_clis.set({})
+    try:
+        yield ctx
+    finally:
+        _request_redis_clis.reset(clis_token)
+        _current.reset(token)
+
+
+class RequestRedisMiddleware:
+    """
+    为每个请求建立 Redis 上下文
+
+    MIDDLEWARE = [..., "python_utils.redis_context.RequestRedisMiddleware", ...]
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with request_redis():
+            return self.get_response(request)
@@ -0,0 +1,115 @@
+import hashlib
+import json
+from typing import Callable, Type
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.core.exceptions import EmptyResultSet
+from redis import RedisError
+
+from .base_count import COUNT_EXACT, get_total
+from .base_models import BaseModel, get_model_version
+from .fast_serializer import serialize_queryset
+from .metrics import record_cache
+from .utils import get_redis_cli, get_setting
+from .log import logger
+
+
+def _result_cache_key(queryset, version, namespace) -> str:
+    """
+    以 SQL 及参数（含过滤条件、排序、分页与机构范围）归一化生成缓存键
+    """
+    sql, params = queryset.query.sql_with_params()
+    raw = json.dumps([queryset.db, namespace, sql, params], default=str, ensure_ascii=False)
+    digest = hashlib.sha1(raw.encode()).hexdigest()
+    return f"result_cache:{queryset.model._meta.db_table}:v{version}:{digest}"
+
+
+def cached_result(queryset, compute: Callable, namespace="", ttl=None):
+    """
+    按查询条件缓存查询结果，模型版本号变更后自动失效
+
+    配置项 settings.RESULT_CACHE:
+    - ENABLED: 是否启用，默认 False，未启用时直接调用 compute
+    - TTL: 缓存有效期(秒)，默认 60
+
+    BaseModel.save / delete 与 delete_model_instances 会递增版本号，
+    queryset.update()、bulk_create 等其他批量写入需调用 bump_model_version
+
+    :param queryset: 用于生成缓存键的查询集，需已应用过滤条件、排序与分页
+    :param compute: 计算结果，返回值需可 JSON 序列化
+    :param namespace: 区分同一查询的不同结果，如序列化器名称
+    :param ttl: 缓存有效期(秒)
+    """
+    if not get_setting("RESULT_CACHE", "ENABLED", False):
+        return compute()
+
+    try:
+        redis_key = _result_cache_key(
+            queryset, get_model_version(queryset.model), namespace
+        )
+        cached = get_redis_cli().get(redis_key)
+    except EmptyResultSet:
+        # 条件必然为空（如 org_id IN ()），结果不缓存
+        return compute()
+    except RedisError as e:
+        logger.warning(f"查询结果缓存读取失败: {str(e)}")
+        return compute()
+
+    record_cache("result_cache", cached is not None)
+    if cached is not None:
+        return json.loads(cached)
+
+    result = compute()
+    try:
+        get_redis_cli().set(
+            redis_key,
+            json.dumps(result, cls=DjangoJSONEncoder, ensure_ascii=False),
+            ex=ttl or get_setting("RESULT_CACHE", "TTL", 60),
+        )
+    except RedisError as e:
+        logger.warning(f"查询结果缓存写入失败: {str(e)}")
+    return result
+
+
+def get_cached_page(
+    model_class: Type[BaseModel],
+    serializer_class,
+    query_data,
+    sorter,
+    limit,
+    page,
+    count_mode=None,
+    ttl=None,
+):
+    """
+    按 getBaseParams 的返回值查询并序列化一页数据，结果与总数一并缓存
+
+    query_data, sorter, limit, page = getBaseParams(request, model=Org)
+    data, total, total_mode = get_cached_page(Org, OrgSerializer, query_data, sorter, limit, page)
+    json_response(data=data, total=total, totalMode=total_mode)
+
+    :return: (当前页数据, 总数, 实际使用的统计模式)
+    """
+    limit, page = int(limit), int(page)
+    # 删除状态已由 getBaseParams 的 no_is_delete 决定，不使用默认管理器的过滤
+    queryset = model_class._base_manager.filter(query_data)
+    page_queryset = queryset.order_by(*sorter)[(page - 1) * limit : page * limit]
+
+    try:
+        page_queryset.query.sql_with_params()
+    except EmptyResultSet:
+        # 条件必然为空（如空的机构范围），直接返回空页，不访问缓存
+        return [], 0, COUNT_EXACT
+
+    def compute():
+        total, total_mode = get_total(queryset, count_mode)
+        return [serialize_queryset(serializer_class, page_queryset), total, total_mode]
+
+    data, total, total_mode = cached_result(
+        page_queryset,
+        compute,
+        namespace=f"{serializer_class.__module__}.{serializer_class.__qualname__}:{count_mode}",
+        ttl=ttl,
+    )
+    return data, total, total_mode
+
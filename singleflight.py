@@ -0,0 +1,146 @@
+import threading
+import time
+from typing import Callable, Optional
+
+from redis import RedisError
+
+from .utils import get_redis_cli, get_setting, new_call_id
+from .log import logger
+
+# 仅持有者可释放租约，避免误删其他 worker 续上的锁
+_RELEASE_LEASE_SCRIPT = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("del", KEYS[1])
+end
+return 0
+"""
+
+
+class _Call:
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    进程内请求合并：同一 key 同一时刻只执行一次 fn，其余线程等待并共享结果
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def do(self, key, fn: Callable):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+
+        if not leader:
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.event.set()
+        return call.result
+
+
+_flight = SingleFlight()
+
+
+def acquire_lease(key, ttl) -> Optional[str]:
+    """
+    获取 Redis 租约锁，成功返回持有者标识，失败返回 None
+
+    :param key: 业务缓存键
+    :param ttl: 租约有效期(秒)，持有者异常退出时自动释放
+    """
+    token = new_call_id()
+    if get_redis_cli().set(f"lease:{key}", token, nx=True, px=int(ttl * 1000)):
+        return token
+    return None
+
+
+def release_lease(key, token):
+    """
+    释放 Redis 租约锁
+    """
+    try:
+        get_redis_cli().eval(_RELEASE_LEASE_SCRIPT, 1, f"lease:{key}", token)
+    except RedisError as e:
+        logger.warning(f"租约释放失败: {str(e)}")
+
+
+def coalesce(
+    key,
+    read: Callable,
+    compute: Callable,
+    write: Callable,
+    read_stale: Callable = None,
+):
+    """
+    合并缓存未命中时的回源请求
+    1. 进程内同一 key 仅一个线程回源，其余线程共享结果
+    2. 跨 worker 通过 Redis 租约锁保证仅一个 worker 查询数据库
+    3. 未拿到租约的 worker 短暂轮询缓存，超时后读取旧副本，仍无则自行回源
+
+    配置项 settings.ORG_CACHE:
+    - LEASE_TTL: 租约有效期(秒)，默认 10
+    - WAIT_TIMEOUT: 等待其他 worker 回源的最长时间(秒)，默认 0.5
+    - POLL_INTERVAL: 等待期间轮询缓存的间隔(秒)，默认 0.05
+
+    :param key: 缓存键
+    :param read: 读取缓存，未命中返回 None
+    :param compute: 回源计算
+    :param write: 写入缓存，参数为 compute 的结果
+    :param read_stale: 读取旧副本，未命中返回 None
+    """
+    return _flight.do(key, lambda: _coalesce(key, read, compute, write, read_stale))
+
+
+def _coalesce(key, read, compute, write, read_stale):
+    try:
+        token = acquire_lease(key, get_setting("ORG_CACHE", "LEASE_TTL", 10))
+    except RedisError as e:
+        logger.warning(f"租约获取失败: {str(e)}")
+        return compute()
+
+    # ========================== 1. 持有租约，回源并写缓存 ==========================
+    if token is not None:
+        try:
+            value = compute()
+            if value:
+                write(value)
+            return value
+        finally:
+            release_lease(key, token)
+
+    # ========================== 2. 等待其他 worker 回源 ==========================
+    wait_timeout = get_setting("ORG_CACHE", "WAIT_TIMEOUT", 0.5)
+    poll_interval = get_setting("ORG_CACHE", "POLL_INTERVAL", 0.05)
+    deadline = time.monotonic() + wait_timeout
+    try:
+        while time.monotonic() < deadline:
+            time.sleep(poll_interval)
+            if (value := read()) is not None:
+                return value
+        if read_stale is not None and (value := read_stale()) is not None:
+            logger.info("[旧副本] %s 回源等待超时，返回旧副本", key)
+            return value
+    except RedisError as e:
+        logger.warning(f"等待回源时读取缓存失败: {str(e)}")
+
+    # ========================== 3. 等待超时，自行回源 ==========================
+    return compute()
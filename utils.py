@@ -1,11 +1,32 @@
+import asyncio
+import decimal
+import hashlib
+import json
+import time
 import uuid
+import weakref
+from contextvars import ContextVar
+from typing import Optional
 import jwt
-from datetime import datetime, timedelta, timezone
+import redis.asyncio as aioredis
+from datetime import date, datetime, time as dt_time, timedelta, timezone
 from django.conf import settings
 from django.core.cache import caches
+from django.http import HttpResponse
 from redis import Redis
 from django.urls import path
-from .log import logger
+from .local_cache import LocalCache
+from .metrics import record_cache, timed
+from .log import logger, payload
+
+try:
+    import orjson
+except ImportError:  # 可选依赖，未安装时使用标准库 json
+    orjson = None
+
+_token_cache = None
+# 事件循环 -> {缓存别名: asyncio Redis 客户端}
+_async_redis_clis = weakref.WeakKeyDictionary()
 
 
 def generate_token(user):
@@ -27,32 +48,119 @@ def generate_token(user):
     return token
 
 
+def _get_token_cache():
+    """
+    获取已验签 token 缓存，TOKEN_CACHE_SIZE 为 0 时不缓存
+
+    配置项 settings.JWT_AUTH:
+    - TOKEN_CACHE_SIZE: 最大缓存 token 数，默认 10000
+    - TOKEN_CACHE_TTL: 最长缓存时间(秒)，默认 300，且不超过 token 的 exp
+    """
+    global _token_cache
+
+    size = settings.JWT_AUTH.get("TOKEN_CACHE_SIZE", 10000)
+    if not size:
+        return None
+    if _token_cache is None:
+        _token_cache = LocalCache(
+            max_size=size, ttl=settings.JWT_AUTH.get("TOKEN_CACHE_TTL", 300)
+        )
+    return _token_cache
+
+
+def get_token_cache_stats():
+    """
+    已验签 token 缓存统计：条目数、命中次数、未命中次数
+    """
+    if _token_cache is None:
+        return {"size": 0, "hits": 0, "misses": 0}
+    return _token_cache.stats()
+
+
 def decode_token(token):
     """
     解析token
+
+    验签通过的结果按 token 摘要缓存，缓存有效期不超过 token 的 exp
     """
+    cache = _get_token_cache()
+    if cache is not None:
+        if isinstance(token, str):
+            token = token.encode()
+        # 摘要包含密钥与算法，密钥轮换后旧缓存自然失效
+        digest = hashlib.sha256(
+            b"%s|%s|%s"
+            % (
+                settings.JWT_AUTH["JWT_ALGORITHM"].encode(),
+                str(settings.JWT_AUTH["JWT_SECRET_KEY"]).encode(),
+                token,
+            )
+        ).digest()
+        if (cached := cache.get(digest)) is not None:
+            payload, exp = cached
+            if exp is None or time.time() < exp:
+                record_cache("jwt", True)
+                return dict(payload)
+            cache.delete(digest)
+        record_cache("jwt", False)
+
     try:
-        payload = jwt.decode(
-            token,
-            settings.JWT_AUTH["JWT_SECRET_KEY"],
-            algorithms=[settings.JWT_AUTH["JWT_ALGORITHM"]],
-        )
-        return payload
+        with timed("jwt_decode_seconds"):
+            payload = jwt.decode(
+                token,
+                settings.JWT_AUTH["JWT_SECRET_KEY"],
+                algorithms=[settings.JWT_AUTH["JWT_ALGORITHM"]],
+            )
     except jwt.ExpiredSignatureError:
         return None  # Token has expired
     except jwt.InvalidTokenError:
         return None  # Invalid token
 
+    if cache is not None:
+        exp = payload.get("exp")
+        ttl = None
+        if isinstance(exp, (int, float)):
+            ttl = min(cache.ttl, exp - time.time())
+        else:
+            exp = None
+        cache.set(digest, (payload, exp), ttl)
+        return dict(payload)
+    return payload
+
+
+def get_setting(name, key, default=None):
+    """
+    读取字典型配置项，未配置时返回默认值
+
+    ORG_INDEX = {"ENABLED": True}
+    get_setting("ORG_INDEX", "ENABLED", False)  # 输出：True
+    """
+    return (getattr(settings, name, None) or {}).get(key, default)
+
 
 def new_call_id(replace=""):
     return str(uuid.uuid4()).replace("-", replace)
 
 
+# 请求级 Redis 上下文中已获取的客户端，见 redis_context.request_redis
+_request_redis_clis: ContextVar[Optional[dict]] = ContextVar(
+    "request_redis_clis", default=None
+)
+
+
 def get_redis_cli(alias="default", write=True):
     """
     Helper used for obtaining a raw redis client.
     """
+    clients = _request_redis_clis.get()
+    if clients is not None:
+        if (client := clients.get((alias, write))) is None:
+            client = clients[(alias, write)] = _get_redis_cli(alias, write)
+        return client
+    return _get_redis_cli(alias, write)
+
 
+def _get_redis_cli(alias, write):
     cache = caches[alias]
 
     if not hasattr(cache, "client"):
@@ -65,6 +173,29 @@ def get_redis_cli(alias="default", write=True):
     return client
 
 
+def get_async_redis_cli(alias="default") -> aioredis.Redis:
+    """
+    获取 asyncio Redis 客户端，按 settings.CACHES[alias] 的连接配置创建，
+    连接池按事件循环与缓存别名复用
+    """
+    loop = asyncio.get_running_loop()
+    clients = _async_redis_clis.setdefault(loop, {})
+    if alias not in clients:
+        config = settings.CACHES[alias]
+        location = config["LOCATION"]
+        if isinstance(location, (list, tuple)):
+            location = location[0]
+        location = location.split(",")[0]
+        options = config.get("OPTIONS", {})
+        pool = aioredis.ConnectionPool.from_url(
+            location,
+            password=options.get("PASSWORD"),
+            **options.get("CONNECTION_POOL_KWARGS", {}),
+        )
+        clients[alias] = aioredis.Redis(connection_pool=pool)
+    return clients[alias]
+
+
 # 定义json返回内容
 # 格式：{"code": 0, "msg": "", "success": true "data": {}}
 def json_response(code=200, msg="", success=True, data=None, total=None, **kwargs):
@@ -81,11 +212,58 @@ def json_response(code=200, msg="", success=True, data=None, total=None, **kwarg
     for k, v in kwargs.items():
         r_d[k] = v
 
-    logger.debug(f"json响应内容: {r_d}")
-    logger.info(f"json响应状态码: {code}, msg: {msg}, success: {success}")
+    logger.debug("json响应内容: %s", payload(r_d))
+    logger.info("json响应状态码: %s, msg: %s, success: %s", code, msg, success)
     return r_d
 
 
+def _json_default(obj):
+    """
+    JSON 编码不支持的类型：时间与 format_datetime 格式一致，Decimal 保留精度输出为字符串
+    """
+    if isinstance(obj, datetime):
+        return obj.strftime("%Y-%m-%d %H:%M:%S")
+    if isinstance(obj, date):
+        return obj.strftime("%Y-%m-%d")
+    if isinstance(obj, dt_time):
+        return obj.strftime("%H:%M:%S")
+    if isinstance(obj, (decimal.Decimal, uuid.UUID)):
+        return str(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def dumps_json(obj) -> bytes:
+    """
+    编码为 UTF-8 JSON 字节串，已安装 orjson 时使用 orjson，否则使用标准库 json
+    """
+    if orjson is not None:
+        try:
+            return orjson.dumps(
+                obj,
+                default=_json_default,
+                option=orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME,
+            )
+        except orjson.JSONEncodeError:
+            # 超出 64 位的整数等 orjson 不支持的值，改用标准库
+            pass
+    return json.dumps(
+        obj, default=_json_default, ensure_ascii=False, separators=(",", ":")
+    ).encode()
+
+
+class FastJsonResponse(HttpResponse):
+    """
+    json_response 返回内容的响应类，直接以字节串作为响应体，
+    datetime / date / Decimal / UUID 无需在序列化器中预先转换
+
+    return FastJsonResponse(json_response(data=data, total=total))
+    """
+
+    def __init__(self, data, **kwargs):
+        kwargs.setdefault("content_type", "application/json")
+        super().__init__(content=dumps_json(data), **kwargs)
+
+
 def format_datetime(dt=datetime.now(), fmt="%Y-%m-%d %H:%M:%S"):
     """
     格式化时间